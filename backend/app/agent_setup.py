@@ -1,8 +1,19 @@
 import os
+import re
+import math
+import mmap
+import fcntl
+import hashlib
+from collections import OrderedDict
 from pathlib import Path
 import faiss
 import numpy as np
 import asyncio
+import logging
+import logging.handlers
+import queue
+import contextvars
+from numba import njit, prange
 
 # Semantic Kernel imports
 from semantic_kernel import Kernel
@@ -12,22 +23,20 @@ from semantic_kernel.connectors.ai.google.google_ai import (
     GoogleAIChatCompletion,
     GoogleAITextEmbedding,
 )
-print("✅ Imported Google AI connectors successfully.")
 
 from semantic_kernel.agents import ChatCompletionAgent
 from semantic_kernel.functions.kernel_function_decorator import kernel_function
-from semantic_kernel.memory.semantic_text_memory import SemanticTextMemory
-# from semantic_kernel.connectors.memory.volatile_memory_store import VolatileMemoryStore
 from semantic_kernel.exceptions import ServiceInitializationError
 
 # Import configurations and native functions
-from app.config import GOOGLE_API_KEY, MONGO_DB_URI
+from app.config import GOOGLE_API_KEY
 import app.native_functions as native_functions
 
 # --- Configuration ---
 INDEX_DIR = "faiss_index"
 INDEX_PATH = os.path.join(INDEX_DIR, "main_index.faiss")
-INDEX_TEXT_PATH = os.path.join(INDEX_DIR, "main_index.txt")
+CHUNKS_BIN_PATH = os.path.join(INDEX_DIR, "chunks.bin")
+CHUNKS_OFF_PATH = os.path.join(INDEX_DIR, "chunks.off.npy")
 KNOWLEDGE_FILE = "data/knowledge_base.txt"
 EMBEDDING_MODEL_ID = "models/text-embedding-004"
 CHAT_MODEL_ID = "models/gemini-2.5-flash"
@@ -36,19 +45,153 @@ CHAT_MODEL_ID = "models/gemini-2.5-flash"
 faiss_retriever = None
 embedding_service = None
 
+logger = logging.getLogger(__name__)
+
+
+def configure_logging():
+    """Routes all log records through an in-memory queue.
+
+    print() flushes line-buffered stdout synchronously, which under
+    uvicorn's captured stdout is a syscall per line on the hot path. A
+    QueueHandler makes the emitting side non-blocking and a daemon
+    listener thread drains records to the console.
+    """
+    root = logging.getLogger()
+    if any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers):
+        return
+    log_queue = queue.SimpleQueue()
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    logging.handlers.QueueListener(log_queue, console).start()
+
+
+# Cheap token estimate for chunk sizing: ~4 characters per token.
+_CHARS_PER_TOKEN = 4
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+
+
+def _split_chunks(text: str, max_tokens: int = 400, overlap: int = 40) -> list:
+    """Splits text into retrieval chunks bounded by an approximate token count.
+
+    Splitting on bare "\\n\\n" produced chunks of wildly uneven size: some
+    exceeded the embedding model's input limit (silently truncated), others
+    were single lines that bloated the index. Paragraphs are packed greedily
+    up to the budget, and any single oversize paragraph is hard-split on
+    sentence boundaries with a small sentence overlap so context is not lost
+    at the cut.
+    """
+    max_chars = max_tokens * _CHARS_PER_TOKEN
+    overlap_chars = overlap * _CHARS_PER_TOKEN
+
+    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+
+    pieces = []
+    for para in paragraphs:
+        if len(para) <= max_chars:
+            pieces.append(para)
+            continue
+
+        sentences = _SENTENCE_RE.split(para)
+        current = []
+        current_len = 0
+        for sentence in sentences:
+            if current and current_len + len(sentence) > max_chars:
+                pieces.append(" ".join(current))
+                # Carry the tail sentences over as overlap for the next piece.
+                while current and current_len > overlap_chars:
+                    current_len -= len(current.pop(0)) + 1
+            current.append(sentence)
+            current_len += len(sentence) + 1
+        if current:
+            pieces.append(" ".join(current))
+
+    # Greedily merge small pieces back up to the budget so N stays low.
+    chunks = []
+    buffer = ""
+    for piece in pieces:
+        if buffer and len(buffer) + len(piece) + 2 > max_chars:
+            chunks.append(buffer)
+            buffer = piece
+        else:
+            buffer = f"{buffer}\n\n{piece}" if buffer else piece
+    if buffer:
+        chunks.append(buffer)
+    return chunks
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _dense_topk(matrix, query, k):
+    """Top-k inner-product search over a normalized float32 matrix.
+
+    For a few hundred chunks the FAISS Python<->C++ marshaling costs more
+    than the dot products themselves; a JIT-compiled scan beats it at this
+    scale.
+    """
+    n, d = matrix.shape
+    scores = np.empty(n, dtype=np.float32)
+    for i in prange(n):
+        s = np.float32(0.0)
+        for j in range(d):
+            s += matrix[i, j] * query[j]
+        scores[i] = s
+    return np.argsort(scores)[-k:][::-1]
+
 # --- RAG (FAISS) Setup ---
 
 class FaissRetriever:
     """A custom retriever class to build, save, load, and search a FAISS index."""
 
-    def __init__(self, index_path, text_path, knowledge_file, embedding_svc):
+    # Max number of query embeddings kept in the in-process cache.
+    QUERY_CACHE_SIZE = 1024
+
+    # Chunks per embedding API request, and how many requests to keep in flight.
+    EMBED_BATCH_SIZE = 64
+    EMBED_CONCURRENCY = 8
+
+    # Below this corpus size a plain JIT-compiled matrix scan beats FAISS.
+    DENSE_MAX = 2048
+
+    # Concurrent searches are coalesced into one stacked FAISS call: wait up
+    # to this long (or until this many are queued) before flushing.
+    BATCH_WINDOW_S = 0.005
+    BATCH_MAX = 32
+
+    def __init__(self, index_path, chunks_bin_path, chunks_off_path, knowledge_file, embedding_svc):
         self.index_path = index_path
-        self.text_path = text_path
+        self.matrix_path = os.path.splitext(index_path)[0] + ".npy"
+        self.chunks_bin_path = chunks_bin_path
+        self.chunks_off_path = chunks_off_path
+        self.meta_path = index_path + ".meta"
         self.knowledge_file = knowledge_file
         self.embedding_service = embedding_svc
         self.index = None
+        # Normalized embedding matrix used instead of a FAISS index for
+        # tiny corpora (see DENSE_MAX).
+        self._matrix = None
+        # Transient list of chunk strings, only populated during a build.
         self.chunks_with_content = []
 
+        # Chunks are served out of a flat UTF-8 blob plus an offset table
+        # (bytes after a build, an mmap after a load): ~8 bytes of overhead
+        # per chunk instead of a full PyObject per string, and the mmap'd
+        # form is shared across worker processes via the page cache.
+        self._chunk_data = None
+        self._offsets = None
+
+        # Embedding dimension, cached at build/load time so search can
+        # preallocate query buffers without attribute lookups.
+        self._d = 0
+
+        # Bounded FIFO cache of query embeddings: support conversations repeat
+        # questions, and a hit saves a 100-500 ms embedding API round-trip.
+        self._query_cache = OrderedDict()
+
+        # In-flight searches waiting to be coalesced into one FAISS call.
+        self._pending = []
+        self._flush_handle = None
+
         # Ensure directory exists
         os.makedirs(os.path.dirname(index_path), exist_ok=True)
 
@@ -60,121 +203,408 @@ class FaissRetriever:
         if self._initialized:
             return
             
-        if os.path.exists(self.index_path) and os.path.exists(self.text_path):
-            print(f"Loading existing FAISS index from {self.index_path}")
+        # Let a single query fan out over a few OpenMP threads without
+        # oversubscribing the worker under concurrent requests.
+        faiss.omp_set_num_threads(min(4, os.cpu_count() or 1))
+
+        if self._index_files_present():
+            logger.info(f"Loading existing FAISS index from {self.index_path}")
             await self.load()
         else:
-            print(f"No index found. Building new FAISS index from {self.knowledge_file}...")
+            logger.info(f"No index found. Building new FAISS index from {self.knowledge_file}...")
             await self.build()
-        
+
         self._initialized = True
 
-    async def build(self):
-        """Builds the FAISS index from the knowledge file."""
+    def _index_files_present(self) -> bool:
+        """Checks all on-disk index artifacts with cheap stat calls."""
+        try:
+            for path in (self.chunks_bin_path, self.chunks_off_path):
+                os.stat(path)
+        except FileNotFoundError:
+            return False
+        return os.path.exists(self.index_path) or os.path.exists(self.matrix_path)
+
+    async def build(self, force: bool = False):
+        """Builds the FAISS index from the knowledge file.
+
+        An exclusive lock file serializes concurrent uvicorn workers so only
+        one of them rebuilds; the others load the finished index instead of
+        clobbering each other's output. force=True skips the "index appeared
+        while waiting" shortcut — used when load() just failed on the very
+        artifacts that check would find, where trusting them again would
+        ping-pong between load() and build() until RecursionError.
+        """
         if not self.embedding_service:
-            print("Error: Embedding service not available for building index.")
+            logger.error("Embedding service not available for building index.")
             return
+
+        built_elsewhere = False
+        with open(self.index_path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Another worker may have finished the build while we waited.
+            if not force and self._index_files_present():
+                logger.info("Index appeared while waiting for the build lock; skipping rebuild.")
+                built_elsewhere = True
+            else:
+                await self._build_locked()
+        if built_elsewhere:
+            await self.load()
+
+    async def _build_locked(self):
+        """Performs the actual build; caller must hold the build lock."""
         try:
             with open(self.knowledge_file, "r", encoding="utf-8") as f:
                 content = f.read()
 
-            chunks = content.split("\n\n")
-            self.chunks_with_content = [chunk.strip() for chunk in chunks if chunk.strip()]
+            self.chunks_with_content = _split_chunks(content)
 
             if not self.chunks_with_content:
-                print("Warning: No text chunks found in knowledge file.")
+                logger.warning("No text chunks found in knowledge file.")
                 return
 
-            print(f"Generating {len(self.chunks_with_content)} embeddings...")
+            logger.info(f"Generating {len(self.chunks_with_content)} embeddings...")
 
-            # Generate embeddings asynchronously
-            embeddings = await self.embedding_service.generate_embeddings(self.chunks_with_content)
-
-            embeddings_np = np.array(embeddings, dtype="float32")
+            # Generate embeddings in concurrent batches
+            embeddings_np = await self._embed_chunks(self.chunks_with_content)
             d = embeddings_np.shape[1]
-            print(f"Embedding dimension: {d}")
-
-            self.index = faiss.IndexFlatL2(d)
-            self.index.add(embeddings_np)
-
-            print(f"FAISS index built with {self.index.ntotal} vectors.")
+            self._d = d
+            logger.info(f"Embedding dimension: {d}")
+
+            # Normalize in place and search with inner product: equivalent to
+            # L2 for retrieval, but avoids the catastrophic cancellation that
+            # |a|²+|b|²-2ab suffers on near-unit-norm FP32 vectors.
+            faiss.normalize_L2(embeddings_np)
+
+            n = embeddings_np.shape[0]
+            if n < self.DENSE_MAX:
+                logger.info(f"Corpus has {n} vectors: using JIT dense scan, no FAISS index.")
+                self._matrix = self._hugepage_array(embeddings_np)
+                self.index = None
+            else:
+                self.index = self._make_index(embeddings_np)
+
+            # Pack chunks into the blob + offset layout and drop the
+            # per-string Python objects.
+            encoded = [chunk.encode("utf-8") for chunk in self.chunks_with_content]
+            self._offsets = np.cumsum([0] + [len(e) for e in encoded], dtype=np.uint64)
+            self._chunk_data = b"".join(encoded)
+            self.chunks_with_content = []
+
+            logger.info(f"Retrieval index built with {n} vectors.")
             self.save()
 
-        except Exception as e:
-            print(f"❌ Error building FAISS index: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error building FAISS index")
+
+    async def _embed_chunks(self, chunks) -> np.ndarray:
+        """Embeds chunks in fixed-size batches issued concurrently.
+
+        Sending the whole corpus in one call either trips the API's batch
+        limits or serializes everything into a single slow request. Batching
+        with a concurrency cap overlaps network latency across batches.
+        """
+        sem = asyncio.Semaphore(self.EMBED_CONCURRENCY)
+
+        async def embed(batch):
+            async with sem:
+                return await self.embedding_service.generate_embeddings(batch)
+
+        batches = [
+            chunks[i:i + self.EMBED_BATCH_SIZE]
+            for i in range(0, len(chunks), self.EMBED_BATCH_SIZE)
+        ]
+        results = await asyncio.gather(*[embed(batch) for batch in batches])
+        return np.concatenate([np.asarray(r, dtype="float32") for r in results])
+
+    def _make_index(self, embeddings_np):
+        """Builds a FAISS index sized for the corpus.
+
+        Small corpora use an SQ8 scalar-quantized flat index: exhaustive
+        search is cheap at this size, and storing each component as int8
+        cuts memory 4x with near-zero recall loss. Larger corpora use
+        IVF-PQ, which compresses each vector from 4*d bytes down to M bytes
+        and only probes a subset of the nlist clusters per query instead of
+        scanning every vector.
+        """
+        n, d = embeddings_np.shape
+
+        if n < 10_000:
+            logger.info(f"Corpus has {n} vectors: using SQ8 flat index.")
+            index = faiss.IndexScalarQuantizer(
+                d, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+            index.train(embeddings_np)
+            index.add(embeddings_np)
+            return index
+
+        nlist = max(1, int(4 * math.sqrt(n)))
+        # PQ needs the dimension to split evenly into M sub-vectors.
+        m = next(m for m in (48, 32, 24, 16, 8, 4, 2, 1) if d % m == 0)
+        logger.info(f"Corpus has {n} vectors: using IVF{nlist},PQ{m}x8 index.")
+        quantizer = faiss.IndexFlatIP(d)
+        index = faiss.IndexIVFPQ(quantizer, d, nlist, m, 8)
+        index.train(embeddings_np)
+        index.add(embeddings_np)
+        index.nprobe = max(1, nlist // 16)
+        return index
 
     def save(self):
-        """Saves the index and text chunks to disk."""
-        if self.index is None:
-            print("Error: Index not built, cannot save.")
+        """Saves the index (or dense matrix) and text chunks to disk."""
+        if (self.index is None and self._matrix is None) or self._chunk_data is None:
+            logger.error("Index not built, cannot save.")
             return
-        print(f"Saving index to {self.index_path}...")
-        faiss.write_index(self.index, self.index_path)
-        with open(self.text_path, "w", encoding="utf-8") as f:
-            separator = "\n<---CHUNK_SEPARATOR--->\n"
-            f.write(separator.join(self.chunks_with_content))
-        print("Index and text chunks saved.")
+        logger.info(f"Saving index to {self.index_path}...")
+
+        # The chunk blob + uint64 offset table go to disk as-is so load()
+        # can mmap both and fetch individual chunks on demand.
+        with open(self.chunks_bin_path + ".tmp", "wb") as f:
+            f.write(self._chunk_data)
+        with open(self.chunks_off_path + ".tmp", "wb") as f:
+            np.save(f, np.asarray(self._offsets))
+
+        # Persist the metric version, storage mode and search-time
+        # parameters (nprobe) so load() can restore and validate them.
+        mode = "matrix" if self._matrix is not None else "faiss"
+        with open(self.meta_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("metric=ip\n")
+            f.write(f"mode={mode}\n")
+            f.write(f"nprobe={getattr(self.index, 'nprobe', 0)}\n")
+
+        if self._matrix is not None:
+            with open(self.matrix_path + ".tmp", "wb") as f:
+                np.save(f, self._matrix)
+            main_artifact = self.matrix_path
+        else:
+            faiss.write_index(self.index, self.index_path + ".tmp")
+            main_artifact = self.index_path
+
+        # Install atomically, the index file last, so a concurrent load()
+        # never sees a partially written set of artifacts.
+        for path in (self.chunks_bin_path, self.chunks_off_path, self.meta_path, main_artifact):
+            os.replace(path + ".tmp", path)
+        logger.info("Index and text chunks saved.")
 
     async def load(self):
         """Loads the index and text chunks from disk."""
         try:
-            self.index = faiss.read_index(self.index_path)
-
-            with open(self.text_path, "r", encoding="utf-8") as f:
-                content = f.read()
-
-            separator = "\n<---CHUNK_SEPARATOR--->\n"
-            self.chunks_with_content = [chunk.strip() for chunk in content.split(separator) if chunk.strip()]
-
-            if not self.chunks_with_content or (self.index and len(self.chunks_with_content) != self.index.ntotal):
+            meta = self._read_meta()
+            if meta.get("metric") != "ip":
+                raise ValueError("Index on disk uses the old L2 metric; rebuilding with inner product.")
+
+            if meta.get("mode") == "matrix":
+                self._matrix = self._hugepage_array(np.load(self.matrix_path))
+                self.index = None
+                ntotal = self._matrix.shape[0]
+                self._d = self._matrix.shape[1]
+            else:
+                # IO_FLAG_MMAP maps the index file instead of copying it into
+                # RSS, so startup is fast and worker processes share the pages.
+                self.index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP)
+                if hasattr(self.index, "nprobe") and int(meta.get("nprobe", 0)) > 0:
+                    self.index.nprobe = int(meta["nprobe"])
+                ntotal = self.index.ntotal
+                self._d = self.index.d
+
+            self._offsets = np.load(self.chunks_off_path, mmap_mode="r")
+            chunks_file = open(self.chunks_bin_path, "rb")
+            self._chunk_data = mmap.mmap(chunks_file.fileno(), 0, prot=mmap.PROT_READ)
+            try:
+                self._chunk_data.madvise(mmap.MADV_HUGEPAGE)
+            except (AttributeError, OSError, ValueError):
+                pass
+
+            if self._num_chunks() == 0 or self._num_chunks() != ntotal:
                 raise ValueError("Mismatch between index size and text chunks count or index not loaded.")
 
-            print(f"FAISS index ({getattr(self.index, 'ntotal', 'N/A')} vectors) and {len(self.chunks_with_content)} text chunks loaded.")
+            logger.info(f"Retrieval index ({ntotal} vectors) and {self._num_chunks()} text chunks mapped.")
         except Exception as e:
-            print(f"Error loading FAISS index or text chunks: {e}")
-            print("Will attempt to rebuild.")
-            await self.build()
+            logger.warning(f"Error loading FAISS index or text chunks: {e}; will attempt to rebuild.")
+            # The artifacts on disk are present but unusable — force the
+            # rebuild past build()'s presence recheck.
+            await self.build(force=True)
+
+    @staticmethod
+    def _hugepage_array(arr: np.ndarray) -> np.ndarray:
+        """Copies an array into an anonymous mapping advised to use THP.
+
+        The dense scan walks the whole matrix per query, and with default
+        4KB pages that is a dTLB miss every 4KB of codes; 2MB transparent
+        hugepages cut that ~500x. MADV_HUGEPAGE is purely advisory, so any
+        failure (old kernel, THP disabled) falls back to the plain array.
+        FAISS-owned allocations can't be advised from here, so this covers
+        the buffers we allocate ourselves.
+        """
+        try:
+            buf = mmap.mmap(-1, arr.nbytes)
+            buf.madvise(mmap.MADV_HUGEPAGE)
+            out = np.frombuffer(buf, dtype=arr.dtype).reshape(arr.shape)
+            out[...] = arr
+            return out
+        except (AttributeError, OSError, ValueError):
+            return arr
+
+    def _num_chunks(self) -> int:
+        """Number of chunks in the offset table."""
+        if self._offsets is not None:
+            return len(self._offsets) - 1
+        return 0
+
+    def _get_chunk(self, i: int) -> str:
+        """Decodes a single chunk out of the blob (bytes or mmap)."""
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._chunk_data[start:end].decode("utf-8")
+
+    def _read_meta(self):
+        """Reads the sidecar metadata (metric version, nprobe) saved next to the index."""
+        meta = {}
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    key, _, value = line.strip().partition("=")
+                    meta[key] = value
+        return meta
+
+    async def _embed_query(self, query: str) -> np.ndarray:
+        """Embeds a query, serving repeats from the in-process cache.
+
+        The key includes the embedding model id so a model change naturally
+        invalidates old entries; eviction is FIFO once the cache is full.
+        """
+        cache_key = hashlib.blake2b(
+            (EMBEDDING_MODEL_ID + "\x00" + query).encode("utf-8"), digest_size=16
+        ).digest()
+
+        query_np = self._query_cache.get(cache_key)
+        if query_np is not None:
+            logger.debug("RAG: Query embedding served from cache.")
+            return query_np
+
+        # Kick off the network call first, then allocate the destination
+        # buffer while the response is still in flight.
+        emb_task = asyncio.create_task(self.embedding_service.generate_embeddings([query]))
+        if self._d:
+            query_np = np.empty((1, self._d), dtype="float32")
+            embedding_list = await emb_task
+            query_np[0, :] = embedding_list[0]
+        else:
+            embedding_list = await emb_task
+            query_np = np.array([embedding_list[0]], dtype="float32")
+            self._d = query_np.shape[1]
+        faiss.normalize_L2(query_np)
+
+        if len(self._query_cache) >= self.QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        self._query_cache[cache_key] = query_np
+        return query_np
+
+    async def _batched_search(self, query_np: np.ndarray, k: int):
+        """Coalesces concurrent searches into one stacked FAISS call.
+
+        FAISS is far more efficient on one (B, d) query matrix than on B
+        separate (1, d) calls. Each caller parks its query on a short
+        window; the flush stacks them, searches once in a thread, and
+        resolves every caller with its own row of hits.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query_np, k, future))
+
+        if len(self._pending) >= self.BATCH_MAX:
+            self._flush_pending()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.BATCH_WINDOW_S, self._flush_pending)
+
+        return await future
+
+    def _flush_pending(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if pending:
+            asyncio.ensure_future(self._run_batch(pending))
+
+    async def _run_batch(self, pending):
+        batch = np.vstack([query_np for query_np, _, _ in pending])
+        k_max = max(k for _, k, _ in pending)
+        try:
+            # FAISS releases the GIL inside search; run the blocking C++
+            # call in a thread so the event loop keeps serving requests.
+            distances, indices = await asyncio.to_thread(self.index.search, batch, k_max)
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for row, (_, k, future) in enumerate(pending):
+            if not future.done():
+                future.set_result(indices[row, :k])
 
     async def search(self, query: str, k: int = 2) -> str:
         """Searches the index for the top k similar chunks."""
         if not self._initialized:
             await self.initialize()
             
-        if self.index is None or self.embedding_service is None:
+        if (self.index is None and self._matrix is None) or self.embedding_service is None:
             return "Error: FAISS index or embedding service is not initialized."
 
-        print(f"RAG: Searching for query: '{query}'")
+        logger.debug("RAG: Searching for query: '%s'", query)
         try:
-           # Use generate_embeddings (plural) by passing the query in a list
-            embedding_list = await self.embedding_service.generate_embeddings([query])
-            query_embedding = embedding_list[0] # Get the first (and only) embedding from the list
-            query_np = np.array([query_embedding], dtype="float32")
+            query_np = await self._embed_query(query)
 
-            distances, indices = self.index.search(query_np, k)
+            if self._matrix is not None:
+                top_indices = _dense_topk(self._matrix, query_np[0], k)
+            else:
+                top_indices = await self._batched_search(query_np, k)
 
-            results = []
-            for i in indices[0]:
-                if 0 <= i < len(self.chunks_with_content):
-                    results.append(self.chunks_with_content[i])
-                else:
-                    print(f"Warning: Index {i} out of bounds for text chunks.")
+            # Bounds-check the whole hit list at once instead of per element.
+            idx = np.asarray(top_indices)
+            valid = idx[(idx >= 0) & (idx < self._num_chunks())]
+            if len(valid) != len(idx):
+                logger.warning(f"{len(idx) - len(valid)} search hits out of bounds for text chunks.")
+            results = [self._get_chunk(i) for i in valid.tolist()]
 
             if not results:
-                print("RAG: No relevant documents found.")
+                logger.debug("RAG: No relevant documents found.")
                 return "No relevant information found in the knowledge base."
 
             context = "\n\n".join(results)
-            print(f"RAG: Found context:\n---\n{context}\n---")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("RAG: Found context:\n---\n%s\n---", context)
             return context
-        except Exception as e:
-            print(f"❌ Error during FAISS search: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error during FAISS search")
             return "Error occurred during knowledge base search."
 
 # --- RAG Kernel Function (Agent Tool) ---
+
+# Queries that never need a knowledge base lookup; frozenset membership is O(1).
+_GREETINGS = frozenset({
+    'hi', 'hello', 'hey', 'thanks', 'thank you', 'bye', 'goodbye',
+    'ok', 'okay', 'yes', 'no', 'how are you',
+})
+
+# Pending speculative search started when the user message arrived, before
+# the LLM has decided whether to call the RAG tool: (query, task).
+_prefetch_var = contextvars.ContextVar("rag_prefetch", default=None)
+
+
+def start_prefetch(query: str):
+    """Speculatively kicks off a RAG search for the raw user message.
+
+    The embedding round-trip then overlaps with the LLM's tool-call
+    decision; if the agent asks retrieve_knowledge for the same query, the
+    result is already (or nearly) there. The caller should cancel the
+    returned task if the agent never used it.
+    """
+    if faiss_retriever is None:
+        return None
+    task = asyncio.create_task(faiss_retriever.search(query))
+    _prefetch_var.set((query, task))
+    return task
+
+
 @kernel_function(
     description="Retrieves relevant information from the company's knowledge base or help documents when a user asks a 'how-to' or informational question.",
     name="retrieve_knowledge"
@@ -184,7 +614,20 @@ async def retrieve_knowledge(query: str) -> str:
     This function is called by the agent to get context for a user's question.
     It uses the FaissRetriever instance to perform the search.
     """
+    # Cheap gate: the system prompt tells the LLM not to look up greetings,
+    # but nothing enforces it. Skip the embedding + search round-trip for
+    # obvious chit-chat.
+    if len(query.split()) < 4 and query.lower().strip(' ?!.') in _GREETINGS:
+        logger.debug("RAG: Skipping lookup for low-information query: '%s'", query)
+        return "No knowledge base lookup needed."
+
     if faiss_retriever:
+        pending = _prefetch_var.get()
+        if pending is not None:
+            pending_query, task = pending
+            if pending_query == query and not task.cancelled():
+                logger.debug("RAG: Using prefetched search result.")
+                return await task
         return await faiss_retriever.search(query)
     return "Error: Knowledge base retriever is not initialized."
 
@@ -201,14 +644,14 @@ async def load_system_prompt() -> str:
         with open(prompt_file, 'r', encoding='utf-8') as f:
             system_prompt = f.read()
         
-        print(f"✅ System prompt loaded from {prompt_file}")
+        logger.info(f"System prompt loaded from {prompt_file}")
         return system_prompt
     
     except FileNotFoundError:
-        print(f"❌ Error: system_prompt.md not found in {current_dir}")
+        logger.error(f"system_prompt.md not found in {current_dir}")
         raise
     except Exception as e:
-        print(f"❌ Error loading system prompt: {e}")
+        logger.error(f"Error loading system prompt: {e}")
         raise
 
 
@@ -216,12 +659,13 @@ async def setup_agent() -> ChatCompletionAgent:
     """Initializes and returns the main ChatCompletionAgent."""
     global faiss_retriever, embedding_service
 
-    print("🚀 Setting up Semantic Kernel and Agent...")
+    configure_logging()
+    logger.info("🚀 Setting up Semantic Kernel and Agent...")
     kernel = Kernel()
 
-    print("Initializing Google AI services...")
-    print(f" - Chat Model: {CHAT_MODEL_ID.split('/')[-1]}")
-    print(f" - Embedding Model: {EMBEDDING_MODEL_ID.split('/')[-1]}")
+    logger.info("Initializing Google AI services...")
+    logger.info(f" - Chat Model: {CHAT_MODEL_ID.split('/')[-1]}")
+    logger.info(f" - Embedding Model: {EMBEDDING_MODEL_ID.split('/')[-1]}")
     
     try:
         # Initialize services with correct parameter names
@@ -241,45 +685,55 @@ async def setup_agent() -> ChatCompletionAgent:
         # Register services with the kernel
         kernel.add_service(embedding_service)
         kernel.add_service(chat_service)
-        print("✅ Gemini services added.")
+        logger.info("✅ Gemini services added.")
         
     except ServiceInitializationError as e:
-        print(f"❌ Error adding Gemini services: {e}")
+        logger.error(f"Error adding Gemini services: {e}")
         raise
-    except Exception as e:
-        print(f"❌ Unexpected error adding Gemini services: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Unexpected error adding Gemini services")
         raise
 
-    print("Initializing FAISS Retriever...")
+    logger.info("Initializing FAISS Retriever...")
     try:
         if embedding_service is None:
             raise ValueError("Embedding service failed to initialize, cannot create FaissRetriever.")
         
         faiss_retriever = FaissRetriever(
             INDEX_PATH,
-            INDEX_TEXT_PATH,
+            CHUNKS_BIN_PATH,
+            CHUNKS_OFF_PATH,
             KNOWLEDGE_FILE,
             embedding_service
         )
         
         # Initialize the retriever asynchronously
         await faiss_retriever.initialize()
-        print("✅ FAISS Retriever initialized.")
+        logger.info("✅ FAISS Retriever initialized.")
     except Exception as e:
-        print(f"❌ Error initializing FAISS Retriever: {e}")
+        logger.error(f"Error initializing FAISS Retriever: {e}")
         raise
 
-    print("Loading system prompt from markdown file...")
+    logger.info("Warming up retriever and embedding service...")
+    try:
+        # The first query pays for JIT-compiling the search kernels,
+        # first-touch page faults on the mmap'd index, and the cold TLS
+        # handshake to the embedding API. Pay all of that here instead of
+        # on the first user request; never let a warmup failure block boot.
+        await faiss_retriever.search("warmup query", k=1)
+        logger.info("✅ Warmup query complete.")
+    except Exception as e:
+        logger.warning(f"Warmup query failed (non-critical): {e}")
+
+    logger.info("Loading system prompt from markdown file...")
     try:
         system_prompt = await load_system_prompt()
-        print("✅ System prompt loaded successfully.")
+        logger.info("✅ System prompt loaded successfully.")
     except Exception as e:
-        print(f"❌ Error loading system prompt: {e}")
+        logger.error(f"Error loading system prompt: {e}")
         raise
 
-    print("Creating ChatCompletionAgent...")
+    logger.info("Creating ChatCompletionAgent...")
     try:
         # Use the chat_service instance directly
         agent = ChatCompletionAgent(
@@ -288,12 +742,12 @@ async def setup_agent() -> ChatCompletionAgent:
             instructions=system_prompt,
             name="iNextLabsSupportAgent"
         )
-        print("✅ ChatCompletionAgent created.")
+        logger.info("✅ ChatCompletionAgent created.")
     except Exception as e:
-        print(f"❌ Error creating ChatCompletionAgent: {e}")
+        logger.error(f"Error creating ChatCompletionAgent: {e}")
         raise
 
-    print("Registering functions (tools) with the kernel...")
+    logger.info("Registering functions (tools) with the kernel...")
     try:
         # Import KernelPlugin for creating plugins
         from semantic_kernel.functions import KernelPlugin
@@ -319,12 +773,10 @@ async def setup_agent() -> ChatCompletionAgent:
         )
         kernel.add_plugin(time_plugin)
 
-        print("✅ Native functions, RAG function, and Time plugin registered.")
-    except Exception as e:
-        print(f"❌ Error registering functions/plugins: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.info("✅ Native functions, RAG function, and Time plugin registered.")
+    except Exception:
+        logger.exception("Error registering functions/plugins")
         raise
 
-    print("✅ Agent setup complete.")
+    logger.info("✅ Agent setup complete.")
     return agent
\ No newline at end of file
@@ -1,49 +1,46 @@
 """
 Check the correct parameter names for Google AI classes
+
+Run directly (`python -m app.check_parameters`); importing this module is
+free of side effects — the connector imports and introspection only happen
+inside main().
 """
-import inspect
-from semantic_kernel.connectors.ai.google.google_ai import (
-    GoogleAITextEmbedding,
-    GoogleAIChatCompletion,
-)
-
-print("="*60)
-print("GoogleAITextEmbedding.__init__ signature:")
-print("="*60)
-sig = inspect.signature(GoogleAITextEmbedding.__init__)
-print(sig)
-print("\nParameters:")
-for param_name, param in sig.parameters.items():
-    if param_name != 'self':
-        print(f"  - {param_name}: {param.annotation if param.annotation != inspect.Parameter.empty else 'Any'}")
-        if param.default != inspect.Parameter.empty:
-            print(f"    Default: {param.default}")
-
-print("\n" + "="*60)
-print("GoogleAIChatCompletion.__init__ signature:")
-print("="*60)
-sig = inspect.signature(GoogleAIChatCompletion.__init__)
-print(sig)
-print("\nParameters:")
-for param_name, param in sig.parameters.items():
-    if param_name != 'self':
-        print(f"  - {param_name}: {param.annotation if param.annotation != inspect.Parameter.empty else 'Any'}")
-        if param.default != inspect.Parameter.empty:
-            print(f"    Default: {param.default}")
-
-# Try to get docstrings
-print("\n" + "="*60)
-print("GoogleAITextEmbedding documentation:")
-print("="*60)
-if GoogleAITextEmbedding.__init__.__doc__:
-    print(GoogleAITextEmbedding.__init__.__doc__)
-else:
-    print("No docstring available")
-
-print("\n" + "="*60)
-print("GoogleAIChatCompletion documentation:")
-print("="*60)
-if GoogleAIChatCompletion.__init__.__doc__:
-    print(GoogleAIChatCompletion.__init__.__doc__)
-else:
-    print("No docstring available")
\ No newline at end of file
+
+
+def _describe(cls, title):
+    import inspect
+
+    print("=" * 60)
+    print(f"{title}.__init__ signature:")
+    print("=" * 60)
+    sig = inspect.signature(cls.__init__)
+    print(sig)
+    print("\nParameters:")
+    for param_name, param in sig.parameters.items():
+        if param_name != 'self':
+            print(f"  - {param_name}: {param.annotation if param.annotation != inspect.Parameter.empty else 'Any'}")
+            if param.default != inspect.Parameter.empty:
+                print(f"    Default: {param.default}")
+
+    print("\n" + "=" * 60)
+    print(f"{title} documentation:")
+    print("=" * 60)
+    if cls.__init__.__doc__:
+        print(cls.__init__.__doc__)
+    else:
+        print("No docstring available")
+
+
+def main():
+    from semantic_kernel.connectors.ai.google.google_ai import (
+        GoogleAITextEmbedding,
+        GoogleAIChatCompletion,
+    )
+
+    _describe(GoogleAITextEmbedding, "GoogleAITextEmbedding")
+    print()
+    _describe(GoogleAIChatCompletion, "GoogleAIChatCompletion")
+
+
+if __name__ == "__main__":
+    main()
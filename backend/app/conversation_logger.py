@@ -1,152 +1,322 @@
-import pymongo
-from datetime import datetime
+import asyncio
+import re
+import time
+from collections import deque
+from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-from app.config import MONGO_DB_URI
 
-# --- Database Connection ---
-try:
-    print("Setting up conversation logger connection to MongoDB...")
-    client = pymongo.MongoClient(MONGO_DB_URI, serverSelectionTimeoutMS=10000)
-    client.admin.command('ismaster')
-    db = client.supportDB
-    conversations_collection = db.conversations
-    print("✅ Conversation logger connected to MongoDB.")
-except Exception as e:
-    print(f"❌ Conversation logger MongoDB connection failed: {e}")
-    conversations_collection = None
+from bson import ObjectId
+from pymongo import WriteConcern
+from pymongo.collation import Collation
+
+# One shared client/pool for the whole process — see app/db.py
+from app.db import conversations_collection
 
 
 class ConversationLogger:
-    """Helper class to log conversations to MongoDB"""
-    
-    @staticmethod
-    def log_conversation(
+    """Helper class to log conversations to MongoDB.
+
+    Writes are buffered in-process and flushed as a single unacknowledged
+    `insert_many` (w=0) once BATCH_SIZE docs accumulate or FLUSH_INTERVAL_S
+    elapses, so no chat request ever pays a per-document write-ack RTT.
+    Logging is best-effort telemetry; losing a batch on a crash is an
+    acceptable trade for keeping the write out of the request path.
+    """
+
+    BATCH_SIZE = 100
+    FLUSH_INTERVAL_S = 1.0
+
+    _buffer: deque = deque()
+    _buffer_lock: Optional[asyncio.Lock] = None
+    _flush_timer: Optional[asyncio.Task] = None
+
+    @classmethod
+    def _lock(cls) -> asyncio.Lock:
+        if cls._buffer_lock is None:
+            cls._buffer_lock = asyncio.Lock()
+        return cls._buffer_lock
+
+    @classmethod
+    async def flush(cls) -> int:
+        """Flush buffered docs with a single unacknowledged insert_many.
+
+        Returns the number of documents handed to the driver. Call on
+        application shutdown so the tail of the buffer is not lost.
+        """
+        if conversations_collection is None:
+            cls._buffer.clear()
+            return 0
+
+        async with cls._lock():
+            if not cls._buffer:
+                return 0
+            batch = list(cls._buffer)
+            cls._buffer.clear()
+
+        try:
+            fire_and_forget = conversations_collection.with_options(
+                write_concern=WriteConcern(w=0)
+            )
+            # No bypass_document_validation here: pymongo rejects it
+            # client-side on unacknowledged (w=0) writes, which would fail
+            # every flush. The collection has no validator anyway.
+            await fire_and_forget.insert_many(batch, ordered=False)
+            return len(batch)
+        except Exception as e:
+            print(f"❌ Error flushing conversation log batch: {e}")
+            return 0
+
+    @classmethod
+    async def _flush_after_interval(cls):
+        try:
+            await asyncio.sleep(cls.FLUSH_INTERVAL_S)
+            await cls.flush()
+        finally:
+            cls._flush_timer = None
+
+    @classmethod
+    def _schedule_flush(cls):
+        if cls._flush_timer is None or cls._flush_timer.done():
+            cls._flush_timer = asyncio.create_task(cls._flush_after_interval())
+
+    @classmethod
+    async def log_conversation(
+        cls,
         user_message: str,
         agent_response: str,
         conversation_history: List[Dict],
         metadata: Optional[Dict] = None
-    ) -> Optional[str]:
+    ) -> bool:
         """
-        Logs a conversation turn to MongoDB.
-        
+        Buffers a conversation turn for batched logging to MongoDB.
+
         Args:
             user_message: The user's input message
             agent_response: The agent's response
             conversation_history: Full conversation history
             metadata: Additional metadata (e.g., session_id, user_id, ip_address)
-            
+
         Returns:
-            str: The inserted document ID, or None if failed
+            bool: True if the document was buffered for insertion
         """
         if conversations_collection is None:
             print("⚠️ Cannot log conversation: Database not connected")
-            return None
-        
+            return False
+
         try:
-            # Prepare the conversation document
+            # Prepare the conversation document. Only the current turn is
+            # stored — user_message/agent_response are the delta, and the
+            # full transcript is reconstructible by sorting the session's
+            # docs on timestamp. Embedding full_history made total storage
+            # quadratic in the number of turns.
             conversation_doc = {
                 "timestamp": datetime.utcnow(),
                 "user_message": user_message,
                 "agent_response": agent_response,
-                "conversation_length": len(conversation_history),
-                "full_history": conversation_history,
-                "metadata": metadata or {},
-                "response_length": len(agent_response),
-                "message_length": len(user_message)
+                "conversation_length": len(conversation_history)
             }
-            
-            # Add metadata fields if provided
+
+            # Promote the indexed fields to top level; anything else stays
+            # under metadata. Storing them in both places doubled their
+            # footprint in every document and every find() payload.
             if metadata:
-                if "session_id" in metadata:
-                    conversation_doc["session_id"] = metadata["session_id"]
-                if "user_id" in metadata:
-                    conversation_doc["user_id"] = metadata["user_id"]
-                if "ip_address" in metadata:
-                    conversation_doc["ip_address"] = metadata["ip_address"]
-            
-            # Insert into MongoDB
-            result = conversations_collection.insert_one(conversation_doc)
-            print(f"✅ Conversation logged with ID: {result.inserted_id}")
-            return str(result.inserted_id)
-            
+                extra = {}
+                for key, value in metadata.items():
+                    if key in ("session_id", "user_id", "ip_address"):
+                        conversation_doc[key] = value
+                    else:
+                        extra[key] = value
+                if extra:
+                    conversation_doc["metadata"] = extra
+
+            # Buffer for the next batched insert_many
+            async with cls._lock():
+                cls._buffer.append(conversation_doc)
+                buffered = len(cls._buffer)
+
+            if buffered >= cls.BATCH_SIZE:
+                await cls.flush()
+            else:
+                cls._schedule_flush()
+            return True
+
         except Exception as e:
             print(f"❌ Error logging conversation: {e}")
-            return None
-    
-    @staticmethod
-    def get_conversation_stats() -> Dict:
-        """Get statistics about logged conversations"""
+            return False
+
+    # Stats are polled by dashboards far more often than they change;
+    # cache the aggregation result briefly to avoid re-running it.
+    STATS_CACHE_TTL_S = 60.0
+    _stats_cache: Dict = {}
+
+    @classmethod
+    async def get_conversation_stats(cls, window_days: int = 30) -> Dict:
+        """Get statistics about conversations logged in the last window_days.
+
+        The aggregation $matches on the indexed timestamp field first, so
+        $group only sees the bounded window instead of the whole collection.
+        """
         if conversations_collection is None:
             return {"error": "Database not connected"}
-        
+
+        cached = cls._stats_cache.get(window_days)
+        if cached and time.monotonic() - cached[0] < cls.STATS_CACHE_TTL_S:
+            return cached[1]
+
         try:
-            total_conversations = conversations_collection.count_documents({})
-            
-            # Get average response length
+            # Metadata read, O(1) — count_documents({}) would scan the
+            # whole _id index for an exactness the dashboard doesn't need
+            total_conversations = await conversations_collection.estimated_document_count()
+
+            # Average lengths over the window: bound via the timestamp
+            # index, derive lengths server-side with $strLenCP (they are
+            # no longer stored per doc), and shrink intermediate docs
+            # before grouping
             pipeline = [
+                {"$match": {"timestamp": {"$gte": datetime.utcnow() - timedelta(days=window_days)}}},
+                {
+                    "$project": {
+                        "_id": 0,
+                        "response_length": {"$strLenCP": {"$ifNull": ["$agent_response", ""]}},
+                        "message_length": {"$strLenCP": {"$ifNull": ["$user_message", ""]}}
+                    }
+                },
                 {
                     "$group": {
                         "_id": None,
                         "avg_response_length": {"$avg": "$response_length"},
-                        "avg_message_length": {"$avg": "$message_length"},
-                        "total_conversations": {"$sum": 1}
+                        "avg_message_length": {"$avg": "$message_length"}
                     }
                 }
             ]
-            
-            stats = list(conversations_collection.aggregate(pipeline))
-            
+
+            stats = await conversations_collection.aggregate(pipeline).to_list(1)
+
             if stats:
-                return {
+                result = {
                     "total_conversations": total_conversations,
                     "avg_response_length": round(stats[0].get("avg_response_length", 0), 2),
                     "avg_message_length": round(stats[0].get("avg_message_length", 0), 2)
                 }
             else:
-                return {"total_conversations": total_conversations}
-                
+                result = {"total_conversations": total_conversations}
+
+            cls._stats_cache[window_days] = (time.monotonic(), result)
+            return result
+
         except Exception as e:
             print(f"❌ Error getting conversation stats: {e}")
             return {"error": str(e)}
-    
+
+    # New docs no longer embed a history array, but legacy ones do —
+    # excluding it keeps list responses small either way.
+    LIST_PROJECTION = {"full_history": 0}
+
     @staticmethod
-    def get_recent_conversations(limit: int = 10) -> List[Dict]:
-        """Retrieve recent conversations"""
+    async def get_recent_conversations(limit: int = 10, session_id: Optional[str] = None) -> List[Dict]:
+        """Retrieve recent conversations, optionally scoped to one session.
+
+        With a session_id the filter plus sort is answered entirely by the
+        compound session_ts index, so no in-memory sort is needed. Legacy
+        full_history arrays are omitted — use get_conversation_by_id for
+        the detail view.
+        """
         if conversations_collection is None:
             return []
-        
+
         try:
-            conversations = conversations_collection.find().sort("timestamp", -1).limit(limit)
+            query_filter = {"session_id": session_id} if session_id else {}
+            cursor = (
+                conversations_collection
+                .find(query_filter, ConversationLogger.LIST_PROJECTION)
+                .sort("timestamp", -1)
+                .limit(limit)
+            )
             result = []
-            for conv in conversations:
+            for conv in await cursor.to_list(length=limit):
                 conv["_id"] = str(conv["_id"])  # Convert ObjectId to string
                 result.append(conv)
             return result
         except Exception as e:
             print(f"❌ Error retrieving conversations: {e}")
             return []
-    
+
     @staticmethod
-    def search_conversations(query: str, limit: int = 20) -> List[Dict]:
-        """Search conversations by text"""
+    async def get_conversation_by_id(conv_id: str) -> Optional[Dict]:
+        """Fetch one conversation turn in full."""
+        if conversations_collection is None:
+            return None
+
+        try:
+            conv = await conversations_collection.find_one({"_id": ObjectId(conv_id)})
+            if conv:
+                conv["_id"] = str(conv["_id"])
+            return conv
+        except Exception as e:
+            print(f"❌ Error retrieving conversation {conv_id}: {e}")
+            return None
+
+    @staticmethod
+    async def search_conversations(
+        query: str,
+        limit: int = 20,
+        phrase: bool = False,
+        regex: bool = False
+    ) -> List[Dict]:
+        """Search conversations by text.
+
+        Uses the compound text index on user_message/agent_response created
+        by create_indexes.py, so the search is an index lookup rather than a
+        full-collection regex scan. Pass phrase=True for exact-phrase
+        matching, or regex=True to fall back to the old (unindexed) scan.
+        """
         if conversations_collection is None:
             return []
-        
+
         try:
-            # Text search on user_message and agent_response
-            search_filter = {
-                "$or": [
-                    {"user_message": {"$regex": query, "$options": "i"}},
-                    {"agent_response": {"$regex": query, "$options": "i"}}
-                ]
-            }
-            
-            conversations = conversations_collection.find(search_filter).sort("timestamp", -1).limit(limit)
+            if regex:
+                # Fallback for patterns $text cannot express. Plain strings
+                # are escaped and anchored with ^ so the case-insensitive
+                # collated index on user_message serves them as a bounded
+                # prefix scan; real regex patterns still scan unindexed.
+                if re.escape(query) == query:
+                    search_filter = {"user_message": {"$regex": f"^{re.escape(query)}"}}
+                    cursor = (
+                        conversations_collection
+                        .find(search_filter, ConversationLogger.LIST_PROJECTION)
+                        .collation(Collation(locale="en", strength=2))
+                        .sort("timestamp", -1)
+                        .limit(limit)
+                    )
+                else:
+                    search_filter = {
+                        "$or": [
+                            {"user_message": {"$regex": query}},
+                            {"agent_response": {"$regex": query}}
+                        ]
+                    }
+                    cursor = (
+                        conversations_collection
+                        .find(search_filter, ConversationLogger.LIST_PROJECTION)
+                        .sort("timestamp", -1)
+                        .limit(limit)
+                    )
+            else:
+                search_term = f'"{query}"' if phrase else query
+                search_filter = {"$text": {"$search": search_term}}
+                projection = {"score": {"$meta": "textScore"}, **ConversationLogger.LIST_PROJECTION}
+                cursor = (
+                    conversations_collection
+                    .find(search_filter, projection)
+                    .sort([("score", {"$meta": "textScore"}), ("timestamp", -1)])
+                    .limit(limit)
+                )
+
             result = []
-            for conv in conversations:
+            for conv in await cursor.to_list(length=limit):
                 conv["_id"] = str(conv["_id"])
                 result.append(conv)
             return result
         except Exception as e:
             print(f"❌ Error searching conversations: {e}")
-            return []
\ No newline at end of file
+            return []
@@ -1,6 +1,11 @@
 import pymongo
+from pymongo.collation import Collation
 from config import MONGO_DB_URI
 
+# Case-insensitive collation (strength=2 ignores case) so prefix regexes
+# can use an index instead of needing the unindexable $options: "i" flag.
+CASE_INSENSITIVE = Collation(locale="en", strength=2)
+
 # Connect to MongoDB
 try:
     print("Connecting to MongoDB Atlas...")
@@ -8,6 +13,8 @@ try:
     client.admin.command('ismaster')
     db = client.supportDB
     conversations_collection = db.conversations
+    tickets_collection = db.tickets
+    users_collection = db.users
     print("✅ Connected successfully!")
 except Exception as e:
     print(f"❌ Connection failed: {e}")
@@ -20,15 +27,41 @@ try:
     # Index on timestamp for sorting recent conversations
     conversations_collection.create_index([("timestamp", -1)])
     print("✅ Created index on 'timestamp'")
+
+    # TTL index: expire conversations after 90 days so the collection
+    # (and its indexes) stay small enough to remain RAM-resident
+    conversations_collection.create_index(
+        [("timestamp", 1)],
+        name="timestamp_ttl",
+        expireAfterSeconds=60 * 60 * 24 * 90
+    )
+    print("✅ Created TTL index on 'timestamp' (90-day retention)")
     
     # Index on session_id for session-based queries
     conversations_collection.create_index("session_id")
     print("✅ Created index on 'session_id'")
+
+    # Compound index so "recent messages for session X" is served in
+    # index order with no in-memory sort stage
+    conversations_collection.create_index(
+        [("session_id", 1), ("timestamp", -1)],
+        name="session_ts"
+    )
+    print("✅ Created compound index 'session_ts' on (session_id, timestamp DESC)")
     
     # Index on user_id for user-based queries (if you use it)
     conversations_collection.create_index("user_id")
     print("✅ Created index on 'user_id'")
-    
+
+    # Case-insensitive index on user_message so anchored ^prefix regexes
+    # become bounded index range scans rather than full collection scans
+    conversations_collection.create_index(
+        [("user_message", 1)],
+        name="user_message_ci",
+        collation=CASE_INSENSITIVE
+    )
+    print("✅ Created case-insensitive index on 'user_message'")
+
     # Text index for full-text search on user messages and agent responses
     conversations_collection.create_index([
         ("user_message", "text"),
@@ -36,6 +69,41 @@ try:
     ])
     print("✅ Created text index on 'user_message' and 'agent_response'")
     
+    # Compound (_id, status) index so check_ticket_status's projected
+    # find_one is covered — answered from the index without fetching the
+    # ticket document
+    tickets_collection.create_index(
+        [("_id", 1), ("status", 1)],
+        name="ticket_status_covering"
+    )
+    print("✅ Created covering index on tickets (_id, status)")
+
+    # Lookups by reporter email (visible throughout the seed data) would
+    # otherwise scan the collection
+    tickets_collection.create_index([("user_email", pymongo.ASCENDING)])
+    print("✅ Created index on tickets 'user_email'")
+
+    # Queue views filter by status and order by priority
+    tickets_collection.create_index(
+        [("status", 1), ("priority", 1)],
+        name="status_priority"
+    )
+    print("✅ Created compound index on tickets (status, priority)")
+
+    # Point-lookup index backing the atomic token-verify update in
+    # verify_and_reset_password. Tokens are 256-bit MACs, so the hash
+    # alone identifies the user; sparse keeps the index limited to
+    # users with an outstanding reset. No TTL here — a TTL index on
+    # reset_token_expiry would delete whole user documents, not just
+    # the token fields (verify/expiry already $unset them).
+    users_collection.create_index(
+        [("reset_token_hash", 1)],
+        name="reset_token_hash",
+        unique=True,
+        sparse=True
+    )
+    print("✅ Created sparse unique index on users reset_token_hash")
+
     print("\n✅ All indexes created successfully!")
     
     # List all indexes
@@ -0,0 +1,49 @@
+"""Shared MongoDB client for the application process.
+
+conversation_logger.py and native_functions.py previously each built
+their own client (and therefore their own connection pool) at import
+time. One Motor client per process is enough: its pool multiplexes all
+collections, keeps the socket count against Atlas low, and avoids
+duplicate TLS handshakes at startup. Import collections from here
+instead of constructing clients in feature modules.
+
+create_indexes.py stays on its own synchronous client — it is a one-off
+CLI script that runs outside the server process.
+"""
+
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config import MONGO_DB_URI
+
+_client: Optional[AsyncIOMotorClient] = None
+
+
+def get_client() -> AsyncIOMotorClient:
+    """Return the process-wide Motor client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(
+            MONGO_DB_URI,
+            serverSelectionTimeoutMS=10000,
+            maxPoolSize=100,
+            minPoolSize=10,
+            waitQueueTimeoutMS=2000,
+            retryWrites=True,
+        )
+    return _client
+
+
+# --- Shared database / collection handles ---
+try:
+    print("Setting up shared async MongoDB client...")
+    db = get_client().supportDB
+    conversations_collection = db.conversations
+    tickets_collection = db.tickets
+    print("✅ Shared MongoDB client created.")
+except Exception as e:
+    print(f"❌ Shared MongoDB client setup failed: {e}")
+    db = None
+    conversations_collection = None
+    tickets_collection = None
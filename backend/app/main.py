@@ -1,10 +1,14 @@
 import uvicorn
 import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
+import json
 import uuid
 
 # Semantic Kernel imports for history management
@@ -12,17 +16,32 @@ from semantic_kernel.contents import ChatHistory, ChatMessageContent, AuthorRole
 from semantic_kernel.agents import ChatCompletionAgent
 
 # Import the agent setup function
-from app.agent_setup import setup_agent
+from app.agent_setup import setup_agent, start_prefetch
 
 # Import conversation logger
 from app.conversation_logger import ConversationLogger
 
+# Sample-data seeders (cheap to import — they defer pymongo/motor)
+from app.db import tickets_collection
+from app.seed_mongodb import seed_database
+from app.seed_users import seed_users
+
+logger = logging.getLogger(__name__)
+
+# Hoisted out of the per-message loops in chat_with_agent
+_SYSTEM = AuthorRole.SYSTEM
+_USER_ROLES = frozenset({"user", "human"})
+
 # --- Lifespan Function for Async Startup ---
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Code here runs BEFORE the application starts accepting requests
     print("🚀 Application Startup: Initializing Agent...")
+    # asyncio.to_thread (FAISS searches, any residual blocking work) runs on
+    # the default executor; size it so concurrent requests don't queue
+    # behind the tiny default pool.
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=32))
     try:
         # Run the async setup_agent function and wait for it to complete
         agent_instance: ChatCompletionAgent = await setup_agent()
@@ -35,10 +54,22 @@ async def lifespan(app: FastAPI):
         # Depending on severity, you might want to raise the exception
         # raise e
 
+    # Seeding is normally a one-shot deploy step (python -m app.seed);
+    # at startup we only backfill an empty database. The guard is an
+    # estimated_document_count — an O(1) metadata read — so warm
+    # restarts skip the seed entirely.
+    try:
+        if tickets_collection is not None and await tickets_collection.estimated_document_count() == 0:
+            await asyncio.gather(seed_database(), seed_users())
+    except Exception as e:
+        print(f"⚠️ Sample-data seeding failed (continuing without it): {e}")
+
     yield # This signals that the startup is complete
 
     # Code here runs AFTER the application is shutting down (optional cleanup)
     print("👋 Application Shutdown.")
+    # Drain any conversation docs still sitting in the log buffer
+    await ConversationLogger.flush()
     app.state.agent = None
 
 # --- App Initialization with Lifespan ---
@@ -46,7 +77,10 @@ async def lifespan(app: FastAPI):
 app = FastAPI(
     title="Client Support Knowledge Agent",
     description="A RAG + Function Calling agent using Semantic Kernel and Gemini",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson serializes datetimes natively and is several times faster than
+    # the stdlib encoder — conversation lists are timestamp-heavy
+    default_response_class=ORJSONResponse
 )
 
 # --- CORS Middleware ---
@@ -99,7 +133,7 @@ def read_root(request: Request):
     }
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat_with_agent(request: Request, payload: ChatRequest):
+async def chat_with_agent(request: Request, payload: ChatRequest, background_tasks: BackgroundTasks):
     """
     Main chat endpoint.
     Receives user message and history, invokes the agent, returns the response.
@@ -117,88 +151,84 @@ async def chat_with_agent(request: Request, payload: ChatRequest):
     # Generate or use provided session_id
     session_id = payload.session_id or str(uuid.uuid4())
 
-    print(f"\n{'='*70}")
-    print(f"📨 New Chat Request")
-    print(f"{'='*70}")
-    print(f"Session ID: {session_id}")
-    print(f"User Message: {payload.message}")
-    print(f"History Length: {len(payload.history)} messages")
+    logger.info("chat request session=%s history=%d", session_id, len(payload.history))
 
     try:
         # 1. Rebuild ChatHistory
         chat_history = ChatHistory()
         
-        # Add history messages
+        # Add history messages in one bulk extend — ChatHistory.add_message
+        # is per-item method dispatch the loop doesn't need
         if payload.history:
-            for msg in payload.history:
-                role = AuthorRole.USER if msg.role.lower() == 'user' else AuthorRole.ASSISTANT
-                chat_history.add_message(ChatMessageContent(role=role, content=msg.content))
+            chat_history.messages.extend(
+                ChatMessageContent(
+                    role=AuthorRole.USER if m.role.lower() in _USER_ROLES else AuthorRole.ASSISTANT,
+                    content=m.content
+                )
+                for m in payload.history
+            )
 
         # 2. Add current user message
         chat_history.add_user_message(payload.message)
 
-        # 3. Invoke agent - pass the chat_history directly
+        # Speculatively start the RAG search so the embedding round-trip
+        # overlaps with the LLM's tool-call decision. retrieve_knowledge
+        # awaits this task when the agent asks for the same query.
+        prefetch_task = start_prefetch(payload.message)
+
+        # 3. Invoke agent - pass the chat_history directly. Per-chunk
+        # diagnostics are DEBUG-gated: unconditional stdout writes per
+        # chunk dominate the streaming loop under load.
         full_response = ""
-        print(f"\n🤖 Agent Processing...")
-        
+        debug = logger.isEnabledFor(logging.DEBUG)
+
         async for response in agent.invoke(chat_history):
-            # Handle different response types
-            if hasattr(response, 'content'):
-                chunk = str(response.content)
-                print(f"   Streaming chunk: {chunk[:100]}{'...' if len(chunk) > 100 else ''}")
-                full_response += chunk
-            elif isinstance(response, str):
-                print(f"   Streaming chunk (str): {response[:100]}{'...' if len(response) > 100 else ''}")
-                full_response += response
-            else:
-                # Try to convert to string
-                chunk = str(response)
-                print(f"   Streaming chunk (converted): {chunk[:100]}{'...' if len(chunk) > 100 else ''}")
-                full_response += chunk
-
-        print(f"\n✅ Agent Response Complete")
-        print(f"Response Length: {len(full_response)} characters")
-        print(f"Response Preview: {full_response[:200]}{'...' if len(full_response) > 200 else ''}")
+            chunk = str(response.content) if hasattr(response, 'content') else str(response)
+            if debug:
+                logger.debug("chunk len=%d", len(chunk))
+            full_response += chunk
+
+        # The agent chose not to (or already did) use the prefetched search.
+        if prefetch_task is not None and not prefetch_task.done():
+            prefetch_task.cancel()
+
+        logger.info("agent response complete session=%s len=%d", session_id, len(full_response))
 
         # 4. Add agent's response to history
         chat_history.add_assistant_message(full_response)
 
-        # 5. Format history for response
-        response_history = []
-        for msg in chat_history.messages:
-            if msg.role != AuthorRole.SYSTEM:
-                response_history.append(
-                    HistoryMessage(
-                        role=msg.role.value,
-                        content=str(msg.content)
-                    )
-                )
+        # 5. Format history once — the same dicts feed both the MongoDB log
+        # and the pydantic response models, so long conversations are only
+        # walked a single time.
+        history_dict = [
+            {
+                "role": msg.role.value,
+                "content": msg.content if isinstance(msg.content, str) else str(msg.content),
+            }
+            for msg in chat_history.messages
+            if msg.role is not _SYSTEM
+        ]
+        response_history = [HistoryMessage(**d) for d in history_dict]
 
         # 6. LOG CONVERSATION TO MONGODB
-        print(f"\n💾 Logging conversation to MongoDB...")
         metadata = {
             "session_id": session_id,
             "ip_address": request.client.host if request.client else "unknown",
         }
         if payload.user_id:
             metadata["user_id"] = payload.user_id
-        
-        # Convert response_history to dict format for MongoDB
-        history_dict = [{"role": msg.role, "content": msg.content} for msg in response_history]
-        
-        log_id = ConversationLogger.log_conversation(
+
+        # Runs after the response is sent, so the client never waits on the
+        # log write. BackgroundTasks also keeps a reference to the coroutine,
+        # unlike a bare create_task which the loop may garbage-collect.
+        background_tasks.add_task(
+            ConversationLogger.log_conversation,
             user_message=payload.message,
             agent_response=full_response,
             conversation_history=history_dict,
             metadata=metadata
         )
-        
-        if log_id:
-            print(f"✅ Conversation logged with ID: {log_id}")
-        else:
-            print(f"⚠️ Failed to log conversation (non-critical)")
 
-        print(f"{'='*70}\n")
         return ChatResponse(
             response=full_response, 
             history=response_history,
@@ -206,11 +236,80 @@ async def chat_with_agent(request: Request, payload: ChatRequest):
         )
 
     except Exception as e:
-        print(f"\n❌ Error during chat processing: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error during chat processing")
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
+@app.post("/chat/stream")
+async def chat_with_agent_stream(request: Request, payload: ChatRequest):
+    """
+    Streaming variant of /chat.
+    Yields agent output chunks as server-sent events the moment they
+    arrive, so time-to-first-byte is first-token latency instead of total
+    generation time, and memory stays O(chunk) rather than O(response).
+    The conversation is logged after the stream completes.
+    """
+    agent: Optional[ChatCompletionAgent] = request.app.state.agent
+
+    if agent is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Agent failed to initialize. Cannot process chat requests."
+        )
+
+    session_id = payload.session_id or str(uuid.uuid4())
+    client_host = request.client.host if request.client else "unknown"
+
+    chat_history = ChatHistory()
+    if payload.history:
+        chat_history.messages.extend(
+            ChatMessageContent(
+                role=AuthorRole.USER if m.role.lower() in _USER_ROLES else AuthorRole.ASSISTANT,
+                content=m.content
+            )
+            for m in payload.history
+        )
+    chat_history.add_user_message(payload.message)
+
+    prefetch_task = start_prefetch(payload.message)
+
+    async def gen():
+        parts = []
+        try:
+            async for response in agent.invoke(chat_history):
+                chunk = str(response.content) if hasattr(response, 'content') else str(response)
+                parts.append(chunk)
+                yield f"data: {json.dumps(chunk)}\n\n".encode()
+        finally:
+            if prefetch_task is not None and not prefetch_task.done():
+                prefetch_task.cancel()
+
+        full_response = "".join(parts)
+        chat_history.add_assistant_message(full_response)
+
+        history_dict = [
+            {
+                "role": msg.role.value,
+                "content": msg.content if isinstance(msg.content, str) else str(msg.content),
+            }
+            for msg in chat_history.messages
+            if msg.role is not _SYSTEM
+        ]
+
+        metadata = {"session_id": session_id, "ip_address": client_host}
+        if payload.user_id:
+            metadata["user_id"] = payload.user_id
+
+        asyncio.create_task(ConversationLogger.log_conversation(
+            user_message=payload.message,
+            agent_response=full_response,
+            conversation_history=history_dict,
+            metadata=metadata
+        ))
+
+        yield f"event: done\ndata: {json.dumps({'session_id': session_id})}\n\n".encode()
+
+    return StreamingResponse(gen(), media_type="text/event-stream")
+
 @app.get("/health")
 def health_check(request: Request):
     """Detailed health check endpoint."""
@@ -226,10 +325,10 @@ def health_check(request: Request):
     }
 
 @app.get("/conversations/stats", response_model=ConversationStatsResponse)
-def get_conversation_stats():
-    """Get statistics about logged conversations"""
+async def get_conversation_stats(window_days: int = 30):
+    """Get statistics about recently logged conversations"""
     try:
-        stats = ConversationLogger.get_conversation_stats()
+        stats = await ConversationLogger.get_conversation_stats(window_days=window_days)
         if "error" in stats:
             raise HTTPException(status_code=500, detail=stats["error"])
         return ConversationStatsResponse(**stats)
@@ -237,23 +336,47 @@ def get_conversation_stats():
         raise HTTPException(status_code=500, detail=f"Error fetching stats: {str(e)}")
 
 @app.get("/conversations/recent")
-def get_recent_conversations(limit: int = 10):
-    """Get recent conversations"""
+async def get_recent_conversations(limit: int = 10, session_id: Optional[str] = None):
+    """Get recent conversations, optionally filtered by session"""
     try:
-        conversations = ConversationLogger.get_recent_conversations(limit=limit)
+        conversations = await ConversationLogger.get_recent_conversations(limit=limit, session_id=session_id)
         return {"conversations": conversations, "count": len(conversations)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching conversations: {str(e)}")
 
+@app.post("/conversations/flush")
+async def flush_conversations():
+    """Force a flush of the buffered conversation log batch."""
+    try:
+        flushed = await ConversationLogger.flush()
+        return {"flushed": flushed}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error flushing conversations: {str(e)}")
+
 @app.get("/conversations/search")
-def search_conversations(query: str, limit: int = 20):
+async def search_conversations(query: str, limit: int = 20, phrase: bool = False):
     """Search conversations by text"""
     try:
-        conversations = ConversationLogger.search_conversations(query=query, limit=limit)
+        conversations = await ConversationLogger.search_conversations(query=query, limit=limit, phrase=phrase)
         return {"conversations": conversations, "count": len(conversations), "query": query}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error searching conversations: {str(e)}")
 
+# Declared after the literal /conversations/* routes so "stats", "recent",
+# "search" and "flush" are not swallowed by the path parameter.
+@app.get("/conversations/{conv_id}")
+async def get_conversation(conv_id: str):
+    """Get a single conversation with its full history"""
+    try:
+        conversation = await ConversationLogger.get_conversation_by_id(conv_id)
+        if conversation is None:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+        return conversation
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching conversation: {str(e)}")
+
 # --- Run the App (Optional: For direct execution) ---
 if __name__ == "__main__":
     print("Starting FastAPI server directly (use 'uvicorn' for development)...")
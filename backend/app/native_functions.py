@@ -1,31 +1,13 @@
-import pymongo
-import os
+import re
+
 from semantic_kernel.functions.kernel_function_decorator import kernel_function
-from app.config import MONGO_DB_URI # Imports the connection string from config.py
-
-# --- Database Connection ---
-# Attempt to set up the MongoDB connection once when the app starts.
-try:
-    print("Attempting to connect to MongoDB Atlas...")
-    # Increase timeout for potentially slower cloud connections
-    client = pymongo.MongoClient(MONGO_DB_URI, serverSelectionTimeoutMS=10000)
-    # The ismaster command is cheap and does not require auth.
-    client.admin.command('ismaster')
-    db = client.supportDB # Replace 'supportDB' if your database name is different
-    tickets_collection = db.tickets # Replace 'tickets' if your collection name is different
-    print("✅ MongoDB connection successful.")
-except pymongo.errors.ConfigurationError:
-    print("❌ MongoDB connection failed: Invalid connection string or configuration.")
-    client = None
-    tickets_collection = None
-except pymongo.errors.ServerSelectionTimeoutError as err:
-    print(f"❌ MongoDB connection failed: Timeout or server not reachable. Error: {err}")
-    client = None
-    tickets_collection = None
-except Exception as e:
-    print(f"❌ An unexpected error occurred with MongoDB connection: {e}")
-    client = None
-    tickets_collection = None
+
+# One shared client/pool for the whole process — see app/db.py
+from app.db import db, tickets_collection
+
+# Compiled once; a single pass and stricter than the old two-substring
+# check (which accepted e.g. "a.b@")
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 
 # --- Native "Action" Functions ---
 
@@ -33,10 +15,11 @@ except Exception as e:
     description="Gets the current status of a specific customer support ticket using its unique ticket ID.",
     name="check_ticket_status"
 )
-def check_ticket_status(ticket_id: str) -> str:
+async def check_ticket_status(ticket_id: str) -> str:
     """
     Fetches the status of a given ticket_id from the MongoDB 'tickets' collection.
-    This function acts as a tool for the AI agent.
+    This function acts as a tool for the AI agent. The query is awaited on
+    Motor's pool, so other requests keep being served during the round-trip.
     Args:
         ticket_id (str): The unique identifier of the support ticket (e.g., 'T-123').
     Returns:
@@ -54,7 +37,11 @@ def check_ticket_status(ticket_id: str) -> str:
     try:
         # Query the 'tickets' collection for the document with _id = ticket_id
         # Ensure your tickets in MongoDB actually use '_id' for the ticket identifier.
-        ticket = tickets_collection.find_one({"_id": ticket_id})
+        # Project just the status so the (_id, status) covering index can
+        # answer the query without a document fetch
+        ticket = await tickets_collection.find_one(
+            {"_id": ticket_id}, projection={"status": 1, "_id": 0}
+        )
 
         if ticket:
             # Found the ticket, return its status
@@ -91,7 +78,7 @@ def request_password_reset(email: str, name: str) -> str:
 
 
  
-    if not email or "@" not in email or "." not in email:
+    if not email or not _EMAIL_RE.match(email):
         print(f"Invalid email format provided: {email}")
         return "Invalid email address format provided. Please provide a valid email."
 
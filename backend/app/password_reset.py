@@ -1,6 +1,12 @@
+import asyncio
+import atexit
+import os
+import re
 import smtplib
 import secrets
 import hashlib
+import threading
+import bcrypt
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
@@ -17,14 +23,213 @@ RESET_URL_BASE = "https://yourdomain.com/reset-password"  # Your frontend URL
 # Create users collection for password reset tokens
 users_collection = db.users
 
+# Keyed BLAKE2b for reset tokens: faster than SHA-256 in CPython and the
+# key turns it into a MAC, so leaked hashes can't be brute-forced offline
+# without the server secret.
+_token_key = os.getenv("TOKEN_HMAC_KEY")
+if not _token_key:
+    # Same policy as the missing-key warnings in config.py: keep dev
+    # setups bootable, but make the downgrade impossible to miss. With
+    # the built-in default the MAC is keyed on a public constant, so it
+    # no longer protects leaked token hashes from offline brute force.
+    print("⚠️ Warning: TOKEN_HMAC_KEY not set; using an insecure built-in key. "
+          "Reset tokens are NOT protected against offline brute force — "
+          "set TOKEN_HMAC_KEY before deploying.")
+    _token_key = "change-me-in-production"
+_TOKEN_KEY = _token_key.encode()
+
+# Compiled once; single C-level match and rejects shapes like "a@b"
+# that the old substring checks let through
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.blake2b(token.encode(), key=_TOKEN_KEY, digest_size=32).hexdigest()
+
+# --- Persistent SMTP connection ---
+# Opening a fresh session per email pays a TLS handshake + AUTH every
+# time, which dominates wall time during a burst of resets. One
+# authenticated connection is reused across sends and recycled
+# periodically to respect provider per-connection limits.
+_SMTP_MAX_MESSAGES = 5000  # recycle the connection after this many sends
+
+_smtp_lock = threading.Lock()
+_smtp_conn = None
+_smtp_sent = 0
+
+
+def _connect_smtp() -> smtplib.SMTP:
+    conn = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+    conn.starttls()  # Secure the connection
+    conn.login(SENDER_EMAIL, SENDER_PASSWORD)
+    return conn
+
+
+def _get_smtp() -> smtplib.SMTP:
+    """Return a healthy authenticated SMTP connection (caller holds _smtp_lock)."""
+    global _smtp_conn, _smtp_sent
+
+    if _smtp_conn is not None and _smtp_sent < _SMTP_MAX_MESSAGES:
+        try:
+            if _smtp_conn.noop()[0] == 250:
+                return _smtp_conn
+        except smtplib.SMTPException:
+            pass
+
+    # Stale, unhealthy or over the recycle limit — reconnect
+    if _smtp_conn is not None:
+        try:
+            _smtp_conn.quit()
+        except Exception:
+            pass
+
+    _smtp_conn = _connect_smtp()
+    _smtp_sent = 0
+    return _smtp_conn
+
+
+def _close_smtp():
+    if _smtp_conn is not None:
+        try:
+            _smtp_conn.quit()
+        except Exception:
+            pass
+
+
+atexit.register(_close_smtp)
+
+# --- Email templates ---
+# Compiled to bytecode once at import; per-email work is just render().
+# The old f-string bodies reassembled the whole multi-KB HTML per call.
+_TEXT_SRC = """
+Hello {{ user_name }},
+
+We received a request to reset your password for your InextLabs account.
+
+Click the link below to reset your password:
+{{ reset_link }}
+
+This link will expire in 1 hour for security reasons.
+
+If you didn't request this password reset, please ignore this email or contact our support team if you have concerns.
+
+Best regards,
+InextLabs Support Team
+support@inextlabs.com
+"""
+
+_HTML_SRC = """
+<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            line-height: 1.6;
+            color: #333;
+        }
+        .container {
+            max-width: 600px;
+            margin: 0 auto;
+            padding: 20px;
+        }
+        .header {
+            background: linear-gradient(135deg, #FF6B35 0%, #E5522E 100%);
+            color: white;
+            padding: 30px;
+            text-align: center;
+            border-radius: 10px 10px 0 0;
+        }
+        .content {
+            background: #f9f9f9;
+            padding: 30px;
+            border-radius: 0 0 10px 10px;
+        }
+        .button {
+            display: inline-block;
+            padding: 15px 30px;
+            background: linear-gradient(135deg, #FF6B35 0%, #FF8C61 100%);
+            color: white;
+            text-decoration: none;
+            border-radius: 8px;
+            margin: 20px 0;
+            font-weight: bold;
+        }
+        .footer {
+            text-align: center;
+            margin-top: 20px;
+            font-size: 12px;
+            color: #666;
+        }
+        .warning {
+            background: #FFF5F2;
+            border-left: 4px solid #FF6B35;
+            padding: 15px;
+            margin: 20px 0;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>Password Reset Request</h1>
+        </div>
+        <div class="content">
+            <p>Hello {{ user_name }},</p>
+
+            <p>We received a request to reset your password for your InextLabs account.</p>
+
+            <p>Click the button below to reset your password:</p>
+
+            <center>
+                <a href="{{ reset_link }}" class="button">Reset My Password</a>
+            </center>
+
+            <div class="warning">
+                <strong>⏰ Important:</strong> This link will expire in 1 hour for security reasons.
+            </div>
+
+            <p>If the button doesn't work, copy and paste this link into your browser:</p>
+            <p style="word-break: break-all; color: #FF6B35;">{{ reset_link }}</p>
+
+            <p>If you didn't request this password reset, please ignore this email or contact our support team if you have concerns.</p>
+
+            <p>Best regards,<br>
+            <strong>InextLabs Support Team</strong></p>
+        </div>
+        <div class="footer">
+            <p>This is an automated email. Please do not reply.</p>
+            <p>Need help? Contact us at support@inextlabs.com</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+# The templates are specialized at import time: each source is split at
+# its {{ placeholder }} holes into static segments, so a send is a plain
+# join of precomputed strings and the two dynamic values — no template
+# engine or format parsing on the hot path.
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# Alternating [static, field_name, static, field_name, ..., static]
+_HTML_PARTS = _PLACEHOLDER_RE.split(_HTML_SRC)
+_TEXT_PARTS = _PLACEHOLDER_RE.split(_TEXT_SRC)
+
+
+def _render_parts(parts: list, fields: dict) -> str:
+    return "".join(
+        fields[part] if i % 2 else part for i, part in enumerate(parts)
+    )
+
 @kernel_function(
     description="Initiates a password reset process for a user by sending a real email with a secure reset link.",
     name="request_password_reset"
 )
-def request_password_reset(email: str) -> str:
+async def request_password_reset(email: str) -> str:
     """
     Real implementation of password reset with email sending.
-    
+
     Process:
     1. Validate email format
     2. Check if user exists
@@ -36,13 +241,13 @@ def request_password_reset(email: str) -> str:
     print(f"🤖 Action: Running 'request_password_reset' for email: {email}")
     
     # Step 1: Validate email format
-    if not email or "@" not in email or "." not in email:
+    if not email or not _EMAIL_RE.match(email):
         print(f"Invalid email format: {email}")
         return "Invalid email address format. Please provide a valid email."
     
     try:
         # Step 2: Check if user exists
-        user = users_collection.find_one({"email": email})
+        user = await users_collection.find_one({"email": email})
         
         if not user:
             # Security: Don't reveal if email exists or not (prevents email enumeration)
@@ -53,12 +258,12 @@ def request_password_reset(email: str) -> str:
         reset_token = secrets.token_urlsafe(32)
         
         # Hash token for storage (never store plain tokens)
-        token_hash = hashlib.sha256(reset_token.encode()).hexdigest()
+        token_hash = _hash_token(reset_token)
         
         # Step 4: Store token with 1-hour expiry
         expiry_time = datetime.utcnow() + timedelta(hours=1)
         
-        users_collection.update_one(
+        await users_collection.update_one(
             {"email": email},
             {
                 "$set": {
@@ -74,7 +279,10 @@ def request_password_reset(email: str) -> str:
         # Step 5: Send email
         reset_link = f"{RESET_URL_BASE}?token={reset_token}&email={email}"
         
-        email_sent = send_reset_email(
+        # SMTP send is blocking (TLS handshake/AUTH on a cold connection,
+        # serialized under _smtp_lock) — keep it off the event loop
+        email_sent = await asyncio.to_thread(
+            send_reset_email,
             to_email=email,
             reset_link=reset_link,
             user_name=user.get("name", "User")
@@ -112,124 +320,24 @@ def send_reset_email(to_email: str, reset_link: str, user_name: str) -> bool:
         message["To"] = to_email
         
         # Plain text version
-        text = f"""
-Hello {user_name},
-
-We received a request to reset your password for your InextLabs account.
+        fields = {"user_name": user_name, "reset_link": reset_link}
+        text = _render_parts(_TEXT_PARTS, fields)
 
-Click the link below to reset your password:
-{reset_link}
-
-This link will expire in 1 hour for security reasons.
-
-If you didn't request this password reset, please ignore this email or contact our support team if you have concerns.
-
-Best regards,
-InextLabs Support Team
-support@inextlabs.com
-        """
-        
         # HTML version (better looking)
-        html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <style>
-        body {{
-            font-family: Arial, sans-serif;
-            line-height: 1.6;
-            color: #333;
-        }}
-        .container {{
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        .header {{
-            background: linear-gradient(135deg, #FF6B35 0%, #E5522E 100%);
-            color: white;
-            padding: 30px;
-            text-align: center;
-            border-radius: 10px 10px 0 0;
-        }}
-        .content {{
-            background: #f9f9f9;
-            padding: 30px;
-            border-radius: 0 0 10px 10px;
-        }}
-        .button {{
-            display: inline-block;
-            padding: 15px 30px;
-            background: linear-gradient(135deg, #FF6B35 0%, #FF8C61 100%);
-            color: white;
-            text-decoration: none;
-            border-radius: 8px;
-            margin: 20px 0;
-            font-weight: bold;
-        }}
-        .footer {{
-            text-align: center;
-            margin-top: 20px;
-            font-size: 12px;
-            color: #666;
-        }}
-        .warning {{
-            background: #FFF5F2;
-            border-left: 4px solid #FF6B35;
-            padding: 15px;
-            margin: 20px 0;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>Password Reset Request</h1>
-        </div>
-        <div class="content">
-            <p>Hello {user_name},</p>
-            
-            <p>We received a request to reset your password for your InextLabs account.</p>
-            
-            <p>Click the button below to reset your password:</p>
-            
-            <center>
-                <a href="{reset_link}" class="button">Reset My Password</a>
-            </center>
-            
-            <div class="warning">
-                <strong>⏰ Important:</strong> This link will expire in 1 hour for security reasons.
-            </div>
-            
-            <p>If the button doesn't work, copy and paste this link into your browser:</p>
-            <p style="word-break: break-all; color: #FF6B35;">{reset_link}</p>
-            
-            <p>If you didn't request this password reset, please ignore this email or contact our support team if you have concerns.</p>
-            
-            <p>Best regards,<br>
-            <strong>InextLabs Support Team</strong></p>
-        </div>
-        <div class="footer">
-            <p>This is an automated email. Please do not reply.</p>
-            <p>Need help? Contact us at support@inextlabs.com</p>
-        </div>
-    </div>
-</body>
-</html>
-        """
-        
+        html = _render_parts(_HTML_PARTS, fields)
+
         # Attach both versions
         part1 = MIMEText(text, "plain")
         part2 = MIMEText(html, "html")
         message.attach(part1)
         message.attach(part2)
         
-        # Send email via SMTP
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()  # Secure the connection
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-            server.send_message(message)
-        
+        # Send via the persistent connection — no per-email TLS/AUTH
+        global _smtp_sent
+        with _smtp_lock:
+            _get_smtp().send_message(message)
+            _smtp_sent += 1
+
         return True
         
     except smtplib.SMTPException as e:
@@ -245,40 +353,38 @@ support@inextlabs.com
     description="Verifies a password reset token and updates the user's password.",
     name="verify_and_reset_password"
 )
-def verify_and_reset_password(token: str, email: str, new_password: str) -> str:
+async def verify_and_reset_password(token: str, email: str, new_password: str) -> str:
     """
     Verifies the reset token and updates the password.
-    
+
     This would be called from your frontend reset password page.
+    Token match, expiry check and password update happen in one atomic
+    find_one_and_update — a single round-trip with no race window
+    between verification and mutation.
     """
     try:
-        # Hash the provided token
-        token_hash = hashlib.sha256(token.encode()).hexdigest()
-        
-        # Find user with matching token and email
-        user = users_collection.find_one({
-            "email": email,
-            "reset_token_hash": token_hash
-        })
-        
-        if not user:
-            return "Invalid or expired reset link. Please request a new password reset."
-        
-        # Check if token is expired
-        if user.get("reset_token_expiry") < datetime.utcnow():
-            return "This reset link has expired. Please request a new password reset."
-        
         # Validate new password (add your password requirements)
         if len(new_password) < 8:
             return "Password must be at least 8 characters long."
-        
-        # Hash new password (use bcrypt in production!)
-        import hashlib
-        password_hash = hashlib.sha256(new_password.encode()).hexdigest()
-        
-        # Update password and clear reset token
-        users_collection.update_one(
-            {"email": email},
+
+        # Hash the provided token
+        token_hash = _hash_token(token)
+
+        # Hash new password with bcrypt (salted, deliberately slow) — in a
+        # worker thread, since ~250 ms of CPU would stall the event loop
+        password_hash = (
+            await asyncio.to_thread(bcrypt.hashpw, new_password.encode(), bcrypt.gensalt(12))
+        ).decode()
+
+        # Atomically verify token + expiry and update the password.
+        # The 256-bit keyed hash identifies the user by itself, so the
+        # filter skips email and the sparse reset_token_hash index serves
+        # this as a point lookup.
+        user = await users_collection.find_one_and_update(
+            {
+                "reset_token_hash": token_hash,
+                "reset_token_expiry": {"$gt": datetime.utcnow()}
+            },
             {
                 "$set": {
                     "password_hash": password_hash,
@@ -290,10 +396,13 @@ def verify_and_reset_password(token: str, email: str, new_password: str) -> str:
                 }
             }
         )
-        
+
+        if not user:
+            return "Invalid or expired reset link. Please request a new password reset."
+
         print(f"✅ Password successfully reset for {email}")
         return "Your password has been successfully reset. You can now log in with your new password."
-        
+
     except Exception as e:
         print(f"❌ Error verifying reset token: {e}")
         return "An error occurred while resetting your password. Please try again."
@@ -8,11 +8,18 @@ Test:
   2. POST /chat (ask questions)
 """
 
+import asyncio
+import hashlib
+import json
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import httpx
 import numpy as np
 import faiss
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 import google.generativeai as genai
 
@@ -30,107 +37,280 @@ genai.configure(api_key=GOOGLE_API_KEY)
 # ============================================================================
 
 faiss_index = None
-text_chunks = None
+# Chunk texts as structure-of-arrays: one contiguous UTF-8 blob plus an
+# int64 offset table, decoded on demand. Cheaper than a list of Python
+# strings (~50 B header each) for large corpora, and row i of the FAISS
+# index maps directly to offsets[i]:offsets[i+1].
+_chunk_blob = None
+_chunk_offsets = None
 is_ready = False
 
+
+def _pack_chunks(chunks: list) -> tuple:
+    """Pack a list of chunk strings into (blob, offsets)."""
+    encoded = [c.encode('utf-8') for c in chunks]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return b''.join(encoded), offsets
+
+
+def _num_chunks() -> int:
+    return 0 if _chunk_offsets is None else len(_chunk_offsets) - 1
+
+
+def _get_chunk(i: int) -> str:
+    return _chunk_blob[_chunk_offsets[i]:_chunk_offsets[i + 1]].decode('utf-8')
+
+# Content-addressed index cache: identical file bytes produce identical
+# chunks/embeddings, so a restart restores from disk (mmap) instead of
+# re-running every embedding API call.
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "rag_cache")
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
+# Paragraph boundary: blank line with optional surrounding whitespace,
+# tolerant of \r\n. Compiled once; re.split runs in C.
+_PARA_RE = re.compile(r'[ \t]*\r?\n[ \t]*\r?\n\s*')
+
+
 def chunk_text(content: str) -> list:
     """
     Split text into chunks by paragraphs (double newline).
     """
     print("📄 Chunking text...")
-    normalized_content = content.replace('\r\n', '\n')
-    chunks = normalized_content.split('\n\n')
-    chunks = [chunk.strip() for chunk in chunks if chunk.strip()]
+    # One C-level regex split handles \r\n normalization too, and
+    # map(str.strip, ...) avoids a Python-level call per paragraph
+    chunks = [c for c in map(str.strip, _PARA_RE.split(content)) if c]
     print(f"✅ Created {len(chunks)} chunks")
     return chunks
 
 
+EMBED_BATCH_SIZE = 100  # API accepts a list of contents per call
+EMBED_DIM = 768
+
+
 def generate_embeddings(texts: list) -> np.ndarray:
     """
     Generate embeddings for text chunks using Gemini.
+    Chunks are sent in batches of EMBED_BATCH_SIZE per API call instead of
+    one HTTP round-trip each, so wall time scales with N/batch rather
+    than N.
     Returns: numpy array of shape (n_chunks, 768)
     """
     print(f"🔢 Generating embeddings for {len(texts)} chunks...")
-    embeddings = []
-    
-    for i, text in enumerate(texts):
+    embeddings_array = np.empty((len(texts), EMBED_DIM), dtype='float32')
+
+    for i in range(0, len(texts), EMBED_BATCH_SIZE):
+        batch = texts[i:i + EMBED_BATCH_SIZE]
         result = genai.embed_content(
             model="models/text-embedding-004",
-            content=text,
+            content=batch,
             task_type="retrieval_document"
         )
-        embeddings.append(result['embedding'])
-        
-        if (i + 1) % 10 == 0:
-            print(f"   Progress: {i + 1}/{len(texts)}")
-    
-    embeddings_array = np.array(embeddings, dtype='float32')
+        embeddings_array[i:i + len(batch)] = np.asarray(result['embedding'], dtype='float32')
+        print(f"   Progress: {min(i + len(batch), len(texts))}/{len(texts)}")
+
     print(f"✅ Embeddings generated: {embeddings_array.shape}")
     return embeddings_array
 
 
+EMBED_CONCURRENCY = 8  # batches in flight at once
+
+# Shared HTTP/2 client for the embedding REST endpoint: one TLS session
+# multiplexes all concurrent batch calls, so only the first request pays
+# a handshake. Created on startup, closed on shutdown.
+EMBED_MODEL_PATH = "/v1beta/models/text-embedding-004"
+_http_client: httpx.AsyncClient = None
+
+
+async def _embed_batch_http(batch: list, task_type: str = "RETRIEVAL_DOCUMENT") -> list:
+    """Embed a list of texts in one request over the shared client."""
+    resp = await _http_client.post(
+        f"{EMBED_MODEL_PATH}:batchEmbedContents",
+        json={
+            "requests": [
+                {
+                    "model": "models/text-embedding-004",
+                    "content": {"parts": [{"text": t}]},
+                    "taskType": task_type,
+                }
+                for t in batch
+            ]
+        },
+    )
+    resp.raise_for_status()
+    return [e["values"] for e in resp.json()["embeddings"]]
+
+
+async def _embed_query_http(text: str) -> list:
+    """Embed a single query over the shared client."""
+    resp = await _http_client.post(
+        f"{EMBED_MODEL_PATH}:embedContent",
+        json={"content": {"parts": [{"text": text}]}, "taskType": "RETRIEVAL_QUERY"},
+    )
+    resp.raise_for_status()
+    return resp.json()["embedding"]["values"]
+
+
+async def generate_embeddings_async(texts: list) -> np.ndarray:
+    """
+    Concurrent version of generate_embeddings for use inside async
+    endpoints: batches go out EMBED_CONCURRENCY at a time over the shared
+    HTTP/2 client, overlapping round-trips on one keep-alive session
+    without touching the event loop with blocking SDK calls.
+    """
+    print(f"🔢 Generating embeddings for {len(texts)} chunks (concurrent)...")
+    embeddings_array = np.empty((len(texts), EMBED_DIM), dtype='float32')
+    sem = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+    async def embed_batch(start: int):
+        batch = texts[start:start + EMBED_BATCH_SIZE]
+        async with sem:
+            values = await _embed_batch_http(batch)
+        embeddings_array[start:start + len(batch)] = np.asarray(values, dtype='float32')
+
+    await asyncio.gather(*[
+        embed_batch(i) for i in range(0, len(texts), EMBED_BATCH_SIZE)
+    ])
+
+    print(f"✅ Embeddings generated: {embeddings_array.shape}")
+    return embeddings_array
+
+
+def _maybe_to_gpu(index: faiss.Index) -> faiss.Index:
+    """
+    Move the index to GPU 0 when a CUDA-enabled faiss build finds one.
+    A batched search then runs as a single kernel launch per QueryBatcher
+    flush. No-op on the faiss-cpu wheel pinned in requirements — swap in
+    faiss-gpu to enable.
+    """
+    if hasattr(faiss, "get_num_gpus") and faiss.get_num_gpus() > 0:
+        res = faiss.StandardGpuResources()
+        index = faiss.index_cpu_to_gpu(res, 0, index)
+        print("🚀 FAISS index moved to GPU 0")
+    return index
+
+
 def build_faiss_index(embeddings: np.ndarray) -> faiss.Index:
     """
     Build FAISS index for similarity search.
+    Vectors are L2-normalized and searched with inner product, so cosine
+    similarity reduces to a single SGEMM with no norm term.
     """
     print("🏗️  Building FAISS index...")
     dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dimension)
+    faiss.normalize_L2(embeddings)
+    # 8-bit scalar quantization: 4x fewer bytes per vector than fp32, so
+    # the (memory-bandwidth-bound) scan moves a quarter of the data per
+    # query at negligible recall cost. For >100k vectors switch to
+    # IndexIVFPQ for a further ~32x compression.
+    index = faiss.IndexScalarQuantizer(
+        dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+    )
+    index.train(embeddings)
     index.add(embeddings)
     print(f"✅ FAISS index built with {index.ntotal} vectors")
     return index
 
 
-def search_faiss(query: str, k: int = 3) -> list:
+class QueryBatcher:
+    """
+    Coalesces concurrent searches into one stacked FAISS call.
+
+    Queries arriving within a short window are vstacked into a (batch, d)
+    matrix and searched together, so FAISS runs one SGEMM and streams the
+    index once for the whole batch instead of once per request.
+    """
+
+    WINDOW_S = 0.005
+    MAX_BATCH = 32
+
+    def __init__(self):
+        self._pending = []
+        self._flush_handle = None
+
+    async def submit(self, query_vec: np.ndarray, k: int):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query_vec, k, future))
+
+        if len(self._pending) >= self.MAX_BATCH:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.WINDOW_S, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        pending, self._pending = self._pending, []
+        if pending:
+            asyncio.ensure_future(self._run_batch(pending))
+
+    async def _run_batch(self, pending):
+        k_max = max(k for _, k, _ in pending)
+        Q = np.vstack([vec for vec, _, _ in pending])
+
+        try:
+            # FAISS releases the GIL inside search; run the blocking C++
+            # call in a thread so the event loop keeps serving requests.
+            scores, indices = await asyncio.to_thread(faiss_index.search, Q, k_max)
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for row, (_, k, future) in enumerate(pending):
+            if not future.done():
+                future.set_result((scores[row, :k], indices[row, :k]))
+
+
+_query_batcher = QueryBatcher()
+
+
+async def search_faiss(query: str, k: int = 3) -> list:
     """
     Search FAISS index for similar chunks.
     Returns: list of retrieved chunks with metadata
     """
     if not is_ready:
         return []
-    
+
     print(f"\n🔍 Searching for: '{query}'")
-    
-    # Generate query embedding
-    result = genai.embed_content(
-        model="models/text-embedding-004",
-        content=query,
-        task_type="retrieval_query"
-    )
-    query_embedding = np.array([result['embedding']], dtype='float32')
-    
-    # Search FAISS
-    distances, indices = faiss_index.search(query_embedding, k)
-    
-    # Retrieve chunks
-    retrieved = []
-    for rank, (idx, dist) in enumerate(zip(indices[0], distances[0]), 1):
-        if 0 <= idx < len(text_chunks):
-            retrieved.append({
-                "rank": rank,
-                "text": text_chunks[idx],
-                "distance": float(dist)
-            })
-            print(f"   Rank {rank}: distance={dist:.4f}")
-    
+
+    # Generate query embedding over the shared keep-alive client
+    values = await _embed_query_http(query)
+    query_embedding = np.array([values], dtype='float32')
+    faiss.normalize_L2(query_embedding)
+
+    # Search FAISS through the batcher (inner product on unit vectors)
+    scores, indices = await _query_batcher.submit(query_embedding, k)
+
+    # Retrieve chunks: one vectorized bounds mask, then .tolist() converts
+    # the whole row in a single C call instead of per-element float()/int()
+    mask = (indices >= 0) & (indices < _num_chunks())
+    valid_idxs = indices[mask].tolist()
+    valid_scores = scores[mask].tolist()
+
+    retrieved = [
+        {"rank": rank, "text": _get_chunk(idx), "score": score}
+        for rank, (idx, score) in enumerate(zip(valid_idxs, valid_scores), 1)
+    ]
+    for item in retrieved:
+        print(f"   Rank {item['rank']}: score={item['score']:.4f}")
+
     return retrieved
 
 
-def generate_answer(query: str, context_chunks: list) -> str:
-    """
-    Generate answer using LLM with retrieved context.
-    """
-    print("✨ Generating answer with LLM...")
-    
-    # Combine context
-    context = "\n\n".join([chunk["text"] for chunk in context_chunks])
-    
-    # Create prompt
-    prompt = f"""You are an expert AI assistant with deep knowledge and analytical capabilities. Your role is to provide comprehensive, accurate, and well-structured answers based on the given context.
+# Static instruction block, assembled once — only context and question
+# vary per request
+PROMPT_PREFIX = """You are an expert AI assistant with deep knowledge and analytical capabilities. Your role is to provide comprehensive, accurate, and well-structured answers based on the given context.
 
 INSTRUCTIONS:
 1. Analyze the provided context carefully and thoroughly
@@ -143,29 +323,60 @@ INSTRUCTIONS:
 8. If the context doesn't fully answer the question, provide the most relevant information available and acknowledge any limitations
 
 CONTEXT INFORMATION:
-{context}
+"""
 
-USER QUESTION:
-{query}
+# One model handle per process instead of a new one per call
+_MODEL = genai.GenerativeModel('gemini-2.5-flash')
+
+# Pool for the blocking Gemini SDK calls made from async endpoints; the
+# event loop keeps serving other requests while a completion is in flight
+_EXECUTOR = ThreadPoolExecutor(max_workers=16)
+
+
+def _build_prompt(query: str, context_chunks: list) -> str:
+    context = "\n\n".join([chunk["text"] for chunk in context_chunks])
+    return (
+        f"{PROMPT_PREFIX}{context}\n\n"
+        f"USER QUESTION:\n{query}\n\n"
+        "DETAILED ANSWER:\n"
+        "Please provide a comprehensive and well-explained response based on the context above."
+    )
+
+
+def generate_answer(query: str, context_chunks: list) -> str:
+    """
+    Generate answer using LLM with retrieved context.
+    """
+    print("✨ Generating answer with LLM...")
+
+    response = _MODEL.generate_content(_build_prompt(query, context_chunks))
 
-DETAILED ANSWER:
-Please provide a comprehensive and well-explained response based on the context above."""
-    
-    # Generate response
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    response = model.generate_content(prompt)
-    
     print(f"✅ Answer generated ({len(response.text)} chars)")
     return response.text
 
 
+def generate_answer_stream(query: str, context_chunks: list):
+    """
+    Stream the LLM answer chunk by chunk as it is generated.
+    """
+    print("✨ Streaming answer with LLM...")
+
+    response = _MODEL.generate_content(_build_prompt(query, context_chunks), stream=True)
+    for chunk in response:
+        if chunk.text:
+            yield chunk.text
+
+
 # ============================================================================
 # FASTAPI APPLICATION
 # ============================================================================
 
 app = FastAPI(
     title="RAG API",
-    description="Upload knowledge base and chat with it"
+    description="Upload knowledge base and chat with it",
+    # /chat responses embed multi-KB answer and source strings; orjson
+    # encodes them several times faster than the stdlib encoder
+    default_response_class=ORJSONResponse
 )
 
 # Enable CORS
@@ -177,10 +388,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.on_event("startup")
+async def _init_http_client():
+    global _http_client
+    _http_client = httpx.AsyncClient(
+        base_url="https://generativelanguage.googleapis.com",
+        http2=True,
+        timeout=30.0,
+        limits=httpx.Limits(max_keepalive_connections=32),
+        headers={"x-goog-api-key": GOOGLE_API_KEY},
+    )
+
+
+@app.on_event("shutdown")
+async def _close_http_client():
+    if _http_client is not None:
+        await _http_client.aclose()
+
 # ============================================================================
 # REQUEST/RESPONSE MODELS
 # ============================================================================
 
+def _trunc(text: str) -> str:
+    """Source preview: first 200 chars."""
+    return text if len(text) <= 200 else text[:200] + "..."
+
+
 class ChatRequest(BaseModel):
     question: str
     top_k: int = 3
@@ -200,7 +434,7 @@ def root():
     return {
         "status": "running",
         "ready": is_ready,
-        "chunks_loaded": len(text_chunks) if text_chunks else 0,
+        "chunks_loaded": _num_chunks(),
         "endpoints": {
             "upload": "POST /upload (upload .txt file)",
             "chat": "POST /chat (ask questions)"
@@ -217,7 +451,7 @@ async def upload_file(file: UploadFile = File(...)):
     - Process: Reads file → Chunks → Embeddings → FAISS index
     - Returns: Success message with chunk count
     """
-    global faiss_index, text_chunks, is_ready
+    global faiss_index, _chunk_blob, _chunk_offsets, is_ready
     
     print("\n" + "="*70)
     print(f"📁 UPLOADING FILE: {file.filename}")
@@ -232,25 +466,49 @@ async def upload_file(file: UploadFile = File(...)):
     
     try:
         # Read file
-        content = await file.read()
-        content = content.decode('utf-8')
+        content_bytes = await file.read()
+        content = content_bytes.decode('utf-8')
         print(f"📖 File size: {len(content)} characters")
-        
+
         if len(content) < 10:
             raise HTTPException(
                 status_code=400,
                 detail="File content is too short"
             )
-        
-        # Step 1: Chunk text
-        text_chunks = chunk_text(content)
-        
-        # Step 2: Generate embeddings
-        embeddings = generate_embeddings(text_chunks)
-        
-        # Step 3: Build FAISS index
-        faiss_index = build_faiss_index(embeddings)
-        
+
+        # Content-addressed cache check: same bytes -> same index
+        digest = hashlib.blake2b(content_bytes, digest_size=16).hexdigest()
+        index_path = os.path.join(CACHE_DIR, f"{digest}.faiss")
+        chunks_path = os.path.join(CACHE_DIR, f"{digest}.chunks.json")
+
+        if os.path.exists(index_path) and os.path.exists(chunks_path):
+            print(f"♻️  Cache hit ({digest}) — restoring index from disk")
+            faiss_index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+            with open(chunks_path, "r", encoding="utf-8") as f:
+                text_chunks = json.load(f)
+        else:
+            # Step 1: Chunk text
+            text_chunks = chunk_text(content)
+
+            # Step 2: Generate embeddings (concurrent batches, off the loop)
+            embeddings = await generate_embeddings_async(text_chunks)
+
+            # Step 3: Build FAISS index, then persist for future restarts
+            faiss_index = build_faiss_index(embeddings)
+
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            faiss.write_index(faiss_index, index_path)
+            with open(chunks_path, "w", encoding="utf-8") as f:
+                json.dump(text_chunks, f)
+            print(f"💾 Index cached ({digest})")
+
+        # Pack chunk texts into the blob + offsets representation
+        _chunk_blob, _chunk_offsets = _pack_chunks(text_chunks)
+
+        # After persisting (GPU indexes can't be serialized), optionally
+        # move search to GPU
+        faiss_index = _maybe_to_gpu(faiss_index)
+
         is_ready = True
         
         print("="*70)
@@ -304,7 +562,7 @@ async def chat(request: ChatRequest):
     
     try:
         # Step 1: Search for similar chunks
-        retrieved_chunks = search_faiss(request.question, k=request.top_k)
+        retrieved_chunks = await search_faiss(request.question, k=request.top_k)
         
         if not retrieved_chunks:
             return ChatResponse(
@@ -313,17 +571,22 @@ async def chat(request: ChatRequest):
                 sources=[]
             )
         
-        # Step 2: Generate answer
-        answer = generate_answer(request.question, retrieved_chunks)
+        # Step 2: Generate answer (blocking SDK call, run off the loop)
+        loop = asyncio.get_running_loop()
+        answer = await loop.run_in_executor(
+            _EXECUTOR, generate_answer, request.question, retrieved_chunks
+        )
         
-        # Step 3: Format sources
+        # Step 3: Format sources — relevance math vectorized over all
+        # chunks at once (cosine [-1, 1] mapped to [0, 1])
+        raw_scores = np.fromiter(
+            (c["score"] for c in retrieved_chunks),
+            dtype='float32', count=len(retrieved_chunks)
+        )
+        relevance = np.round((raw_scores + 1.0) / 2.0, 3).tolist()
         sources = [
-            {
-                "rank": chunk["rank"],
-                "text": chunk["text"][:200] + "..." if len(chunk["text"]) > 200 else chunk["text"],
-                "relevance_score": round(1 / (1 + chunk["distance"]), 3)
-            }
-            for chunk in retrieved_chunks
+            {"rank": chunk["rank"], "text": _trunc(chunk["text"]), "relevance_score": score}
+            for chunk, score in zip(retrieved_chunks, relevance)
         ]
         
         print("="*70)
@@ -341,6 +604,38 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat: answer text is sent as it is generated,
+    so time-to-first-byte is first-token latency instead of full
+    completion time.
+    """
+    if not is_ready:
+        raise HTTPException(
+            status_code=400,
+            detail="Please upload a knowledge base file first using /upload endpoint"
+        )
+
+    if not request.question or len(request.question.strip()) < 3:
+        raise HTTPException(
+            status_code=400,
+            detail="Question is too short"
+        )
+
+    retrieved_chunks = await search_faiss(request.question, k=request.top_k)
+    if not retrieved_chunks:
+        raise HTTPException(
+            status_code=404,
+            detail="I couldn't find relevant information in the knowledge base."
+        )
+
+    return StreamingResponse(
+        generate_answer_stream(request.question, retrieved_chunks),
+        media_type="text/plain"
+    )
+
+
 # ============================================================================
 # MAIN
 # ============================================================================
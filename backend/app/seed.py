@@ -0,0 +1,41 @@
+"""One-shot sample-data seeder.
+
+Usage:
+    python -m app.seed              # seed tickets and users
+    python -m app.seed --tickets    # tickets only
+    python -m app.seed --users      # users only
+
+Meant to be run once at deploy time (or on demand). The app itself only
+falls back to seeding at startup when the tickets collection is empty.
+"""
+
+import argparse
+import asyncio
+
+from app.seed_mongodb import seed_database
+from app.seed_users import seed_users
+
+
+async def _run(tickets: bool, users: bool):
+    tasks = []
+    if tickets:
+        tasks.append(seed_database())
+    if users:
+        tasks.append(seed_users())
+    # Independent collections — overlap the round trips
+    await asyncio.gather(*tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed MongoDB sample data.")
+    parser.add_argument("--tickets", action="store_true", help="Seed sample tickets")
+    parser.add_argument("--users", action="store_true", help="Seed sample users")
+    args = parser.parse_args()
+
+    # No flags means seed everything
+    seed_all = not (args.tickets or args.users)
+    asyncio.run(_run(args.tickets or seed_all, args.users or seed_all))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,78 @@
 # seed_users.py
 
-import pymongo
-import hashlib
-from datetime import datetime
+import functools
+from datetime import datetime, timezone
 from app.config import MONGO_DB_URI
 
-# Connect to MongoDB
-client = pymongo.MongoClient(MONGO_DB_URI)
-db = client.supportDB
-users_collection = db.users
-
-# Sample users
-sample_users = [
-    {
-        "email": "john.doe@example.com",
-        "name": "John Doe",
-        "password_hash": hashlib.sha256("password123".encode()).hexdigest(),
-        "created_at": datetime.utcnow(),
-        "status": "active"
-    },
-    {
-        "email": "your-email@gmail.com",  # ← Use your real email for testing!
-        "name": "Test User",
-        "password_hash": hashlib.sha256("test123".encode()).hexdigest(),
-        "created_at": datetime.utcnow(),
-        "status": "active"
-    }
-]
-
-# Clear existing users (optional)
-users_collection.delete_many({})
-
-# Insert sample users
-result = users_collection.insert_many(sample_users)
-print(f"✅ Inserted {len(result.inserted_ids)} users")
-
-for user in sample_users:
-    print(f"  - {user['email']} (name: {user['name']})")
-
-client.close()
\ No newline at end of file
+# pymongo is imported lazily inside seed_users() — see seed_mongodb.py
+
+
+@functools.lru_cache(maxsize=1)
+def _sample_users():
+    """Build the sample users once, on first use."""
+    # Single clock read for both users; utcnow() is deprecated in 3.12
+    NOW = datetime.now(timezone.utc)
+
+    # Precomputed bcrypt cost-12 hashes (matching verify_and_reset_password)
+    # so the seed does no hashing at all — bcrypt at this cost is ~250 ms
+    # per password by design. The salt is embedded in each hash string.
+    # Regenerate with:
+    #   python -c "import bcrypt; print(bcrypt.hashpw(b'<pw>', bcrypt.gensalt(12)).decode())"
+    return [
+        {
+            "email": "john.doe@example.com",
+            "name": "John Doe",
+            # "password123"
+            "password_hash": "$2b$12$AelSpWN86tfXOrN3kWYLZu.9m2MshX1O/SljVgDfmeV.qTbm9WEvy",
+            "created_at": NOW,
+            "status": "active"
+        },
+        {
+            "email": "your-email@gmail.com",  # ← Use your real email for testing!
+            "name": "Test User",
+            # "test123"
+            "password_hash": "$2b$12$6YS8eWpO75dbosCcuX753eCRZSXiF/DW7kFMzCMQJt5Bzr1lMi9Fe",
+            "created_at": NOW,
+            "status": "active"
+        }
+    ]
+
+
+async def seed_users():
+    """Idempotently upsert the sample users.
+
+    Existing users (matched on email) are left untouched server-side via
+    $setOnInsert, so re-running the seed is a cheap no-op instead of the
+    old delete_many + insert_many wipe. Returns the number of new users.
+    Async so it can be gathered with seed_database() — see seed_mongodb.
+    """
+    from pymongo import UpdateOne
+    from app.seed_mongodb import _client
+
+    sample_users = _sample_users()
+    # Shared per-process client — skips a second SRV/TLS handshake when
+    # seed_database already connected; atexit closes it (see seed_mongodb)
+    client = _client(MONGO_DB_URI)
+    users_collection = client.supportDB.users
+
+    # Emails are the upsert key — enforce uniqueness once up front
+    await users_collection.create_index("email", unique=True)
+
+    result = await users_collection.bulk_write(
+        [
+            UpdateOne({"email": user["email"]}, {"$setOnInsert": user}, upsert=True)
+            for user in sample_users
+        ],
+        ordered=False
+    )
+    print(f"✅ Upserted {result.upserted_count} new user(s), "
+          f"{len(sample_users) - result.upserted_count} already present")
+
+    for user in sample_users:
+        print(f"  - {user['email']} (name: {user['name']})")
+    return result.upserted_count
+
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(seed_users())
@@ -0,0 +1,25 @@
+"""Gunicorn configuration for multi-worker deployments.
+
+Run from the backend/ directory:
+
+    gunicorn -c gunicorn_conf.py app.main:app
+
+Every uvicorn worker otherwise repeats the full startup sequence
+(semantic-kernel imports, Google service inits, FAISS load). With
+preload_app the application module is imported once in the master and
+workers fork from it, sharing those pages copy-on-write; the
+memory-mapped index files are additionally shared through the OS page
+cache. Per-worker lifespan startup still runs, but only pays for the
+pieces that genuinely must be per-process.
+
+Do not open sockets or non-fork-safe file handles at module import time
+in app code — they would be duplicated across the fork.
+"""
+
+import multiprocessing
+
+bind = "127.0.0.1:8000"
+workers = min(4, multiprocessing.cpu_count())
+worker_class = "uvicorn.workers.UvicornWorker"
+
+preload_app = True